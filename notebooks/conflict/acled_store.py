@@ -0,0 +1,346 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import requests
+
+# --- Logger for consistent output ---
+class SimpleLogger:
+    def info(self, message):
+        print(f"INFO: {message}")
+    def error(self, message):
+        print(f"ERROR: {message}")
+
+logger = SimpleLogger()
+
+
+class AcledEventStore:
+    """
+    Local SQLite store of raw ACLED events, kept in sync incrementally.
+
+    Events are keyed by `event_id_cnty` and stored as the raw JSON records returned
+    by the API, together with their ACLED `timestamp` (last modification time).
+    The store remembers, per country, the latest timestamp seen and the range of
+    event dates synced. A sync first fetches any requested dates outside that range,
+    then only asks the API for events added or modified since the latest timestamp
+    and upserts them. Events that ACLED deletes are removed using the `deleted` endpoint.
+
+    Example:
+        store = AcledEventStore("../../data/conflict/acled_events.sqlite")
+        store.sync(countries_of_interest, email, key, start_date=START_DATE)
+        data = store.materialize(start_date=START_DATE, end_date=END_DATE)
+    """
+
+    URL = "https://api.acleddata.com"
+    PAGE_SIZE = 5000
+
+    def __init__(self, path: str | Path = "../../data/conflict/acled_events.sqlite"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS events (
+                    event_id_cnty TEXT PRIMARY KEY,
+                    country TEXT NOT NULL,
+                    event_date TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    record TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS events_country_date ON events (country, event_date);
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    country TEXT PRIMARY KEY,
+                    last_timestamp INTEGER NOT NULL,
+                    last_synced TEXT NOT NULL,
+                    start_date TEXT,
+                    end_date TEXT
+                );
+                CREATE TABLE IF NOT EXISTS deleted_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    deleted_since INTEGER NOT NULL
+                );
+                """
+            )
+            # Stores created before the synced date range was tracked: assume the dates of their stored events.
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sync_state)")]
+            for column in ("start_date", "end_date"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE sync_state ADD COLUMN {column} TEXT")
+            conn.execute(
+                """
+                UPDATE sync_state SET
+                    start_date = (SELECT MIN(event_date) FROM events WHERE events.country = sync_state.country),
+                    end_date = (SELECT MAX(event_date) FROM events WHERE events.country = sync_state.country)
+                WHERE start_date IS NULL OR end_date IS NULL
+                """
+            )
+            conn.execute("DELETE FROM sync_state WHERE start_date IS NULL OR end_date IS NULL")
+
+    @contextmanager
+    def _connect(self):
+        """Opens a connection that commits on success and is always closed."""
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _get(self, endpoint: str, params: dict) -> list[dict]:
+        """
+        Retrieves every page of an ACLED API query.
+
+        Args:
+            endpoint (str): API endpoint, e.g. 'acled/read' or 'deleted/read'.
+            params (dict): Query strings, including credentials and filters.
+
+        Returns:
+            list[dict]: The records of all pages.
+        """
+        records = []
+        page = 1
+        while True:
+            response = requests.get(
+                f"{self.URL}/{endpoint}",
+                params={**params, "limit": self.PAGE_SIZE, "page": page},
+                timeout=120,
+            )
+            response.raise_for_status()
+            payload = response.json()
+            if not payload.get("success", True):
+                raise RuntimeError(f"ACLED API error: {payload.get('error', payload)}")
+
+            data = payload.get("data", [])
+            records.extend(data)
+            if len(data) < self.PAGE_SIZE:
+                return records
+            page += 1
+
+    def _fetch_country(self, country: str, credentials: dict, state: tuple | None, start_date: str, end_date: str | None):
+        """
+        Fetches the events of one country that the store does not have yet.
+
+        Returns the country, its events, and the range of event dates synced once
+        they are stored: the union of the requested range and the range synced before.
+        """
+        end_date = end_date or datetime.today().strftime("%Y-%m-%d")
+        if state is None:
+            # First sync of this country: take the full date range.
+            return country, self._get_dates(country, credentials, start_date, end_date), (start_date, end_date)
+
+        last_timestamp, synced_start, synced_end = state
+        events = []
+        # Dates outside the synced range were never fetched, whatever their timestamp.
+        # The boundary days are fetched again, which the upsert dedupes.
+        if start_date < synced_start:
+            events += self._get_dates(country, credentials, start_date, synced_start)
+        if end_date > synced_end:
+            events += self._get_dates(country, credentials, synced_end, end_date)
+        # '>=' rather than '>' so that events sharing the last timestamp are not lost; upserts dedupe.
+        events += self._get(
+            "acled/read",
+            {**credentials, "country": country, "timestamp": last_timestamp, "timestamp_where": ">="},
+        )
+        return country, events, (min(start_date, synced_start), max(end_date, synced_end))
+
+    def _get_dates(self, country: str, credentials: dict, start_date: str, end_date: str) -> list[dict]:
+        """Fetches every event of one country dated `start_date`..`end_date` (inclusive)."""
+        params = {**credentials, "country": country, "event_date": f"{start_date}|{end_date}", "event_date_where": "BETWEEN"}
+        return self._get("acled/read", params)
+
+    def _upsert(self, conn, country: str, events: list[dict], last_timestamp: int | None, dates: tuple[str, str]) -> int:
+        """
+        Writes one country's fetched events and advances its sync state.
+
+        The watermark only comes from event timestamps. A country without any events
+        keeps its previous watermark, or stays unsynced, so that its next sync is
+        still bounded by the date range rather than asking for every timestamp.
+        `dates` is the range of event dates synced, recorded with the watermark.
+        """
+        rows = [
+            (e["event_id_cnty"], country, e["event_date"], int(e["timestamp"]), json.dumps(e))
+            for e in events
+        ]
+        conn.executemany(
+            """
+            INSERT INTO events (event_id_cnty, country, event_date, timestamp, record)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (event_id_cnty) DO UPDATE SET
+                country = excluded.country,
+                event_date = excluded.event_date,
+                timestamp = excluded.timestamp,
+                record = excluded.record
+            WHERE excluded.timestamp >= events.timestamp
+            """,
+            rows,
+        )
+
+        if not rows and last_timestamp is None:
+            return 0
+        # Deletions need checking from the first event stored; later syncs advance this.
+        conn.execute(
+            "INSERT OR IGNORE INTO deleted_state VALUES (0, ?)", (min(row[3] for row in rows) if rows else last_timestamp,)
+        )
+        last_timestamp = max([row[3] for row in rows] + ([last_timestamp] if last_timestamp is not None else []))
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO sync_state (country, last_timestamp, last_synced, start_date, end_date)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (country, last_timestamp, datetime.now(timezone.utc).isoformat(), *dates),
+        )
+        return len(rows)
+
+    def _remove_deleted(self, credentials: dict, since: int) -> int:
+        """
+        Removes events that ACLED deleted at or after the `since` timestamp.
+
+        The deletion watermark is advanced to the latest deletion seen in the same
+        transaction as the deletes, so a failed request leaves it where it was and the
+        next sync asks for the same deletions again.
+        """
+        deleted = self._get(
+            "deleted/read",
+            {**credentials, "deleted_timestamp": since, "deleted_timestamp_where": ">="},
+        )
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany("DELETE FROM events WHERE event_id_cnty = ?", [(d["event_id_cnty"],) for d in deleted])
+            nr_deleted = conn.total_changes - before
+            deleted_since = max([since] + [int(d["deleted_timestamp"]) for d in deleted if d.get("deleted_timestamp")])
+            conn.execute("INSERT OR REPLACE INTO deleted_state VALUES (0, ?)", (deleted_since,))
+        return nr_deleted
+
+    def sync(
+        self,
+        countries: list[str],
+        email_address: str,
+        access_key: str,
+        start_date: str = "2019-01-01",
+        end_date: str | None = None,
+        max_workers: int = 8,
+    ) -> pd.DataFrame:
+        """
+        Brings the store up to date with the ACLED API.
+
+        New countries fetch `start_date`..`end_date`. Countries already in the store
+        fetch the dates of that range they have not synced yet (e.g. after moving
+        `start_date` earlier or `end_date` later), then only the events whose ACLED
+        timestamp is at or after the last one seen.
+        Countries are fetched in parallel and written as each one completes, so an
+        interrupted sync keeps the countries it finished. If any country or the
+        deleted events cannot be retrieved, the others are still stored and a
+        RuntimeError is raised at the end, so a partial store is never mistaken for
+        a complete one.
+
+        Args:
+            countries (list[str]): ACLED country names, e.g. `countries_of_interest`.
+            email_address (str): ACLED account email.
+            access_key (str): ACLED API key.
+            start_date (str): First event date to sync.
+            end_date (str | None): Last event date to sync. Defaults to today.
+            max_workers (int): Number of countries fetched concurrently.
+
+        Returns:
+            pd.DataFrame: Number of events added or updated per country. The number of
+                deleted events removed is stored in `attrs['nrDeleted']`.
+
+        Raises:
+            RuntimeError: If any country or the deleted events failed to sync.
+        """
+        credentials = {"email": email_address, "key": access_key}
+        with self._connect() as conn:
+            states = {
+                row[0]: row[1:]
+                for row in conn.execute("SELECT country, last_timestamp, start_date, end_date FROM sync_state")
+            }
+            deleted_since = conn.execute("SELECT deleted_since FROM deleted_state").fetchone()
+
+        # Deletions are only relevant for events already in the store.
+        nr_deleted = 0
+        failures = {}
+        if states:
+            since = deleted_since[0] if deleted_since else min(state[0] for state in states.values())
+            try:
+                nr_deleted = self._remove_deleted(credentials, since)
+                logger.info(f"{nr_deleted} events deleted by ACLED removed from the store.")
+            except Exception as e:
+                logger.error(f"Could not retrieve deleted ACLED events: {e}")
+                failures["deleted events"] = e
+
+        summary = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_country, country, credentials, states.get(country), start_date, end_date): country
+                for country in countries
+            }
+            for future in as_completed(futures):
+                country = futures[future]
+                try:
+                    _, events, dates = future.result()
+                except Exception as e:
+                    logger.error(f"ACLED sync failed for {country}: {e}")
+                    failures[country] = e
+                    continue
+                with self._connect() as conn:
+                    state = states.get(country)
+                    nr_upserted = self._upsert(conn, country, events, state[0] if state else None, dates)
+                logger.info(f"{country}: {nr_upserted} events added or updated.")
+                summary.append({"country": country, "nrUpserted": nr_upserted})
+
+        if failures:
+            raise RuntimeError(f"ACLED sync incomplete, failed for: {', '.join(failures)}. Run it again to retry.")
+
+        summary = pd.DataFrame(summary, columns=["country", "nrUpserted"])
+        summary.attrs["nrDeleted"] = nr_deleted
+        return summary
+
+    def materialize(
+        self,
+        countries: list[str] | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        convert_types: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Returns the stored events for a date range as a DataFrame.
+
+        The output has the same columns as `extraction.acled_api`, so it can be passed
+        to the `processing` functions unchanged.
+
+        Args:
+            countries (list[str] | None): Countries to include. All if None.
+            start_date (str | None): First event date (inclusive), 'YYYY-MM-DD'.
+            end_date (str | None): Last event date (inclusive), 'YYYY-MM-DD'.
+            convert_types (bool): Apply `processing.data_type_conversion` to the result.
+
+        Returns:
+            pd.DataFrame: One row per event, sorted by event date.
+        """
+        query = "SELECT record FROM events WHERE 1 = 1"
+        params = []
+        if countries is not None:
+            query += f" AND country IN ({', '.join('?' * len(countries))})"
+            params.extend(countries)
+        if start_date is not None:
+            query += " AND event_date >= ?"
+            params.append(start_date)
+        if end_date is not None:
+            query += " AND event_date <= ?"
+            params.append(end_date)
+        query += " ORDER BY event_date, event_id_cnty"
+
+        with self._connect() as conn:
+            records = [json.loads(row[0]) for row in conn.execute(query, params)]
+        data = pd.DataFrame.from_records(records)
+
+        if convert_types and not data.empty:
+            from acled_conflict_analysis import processing
+
+            processing.data_type_conversion(data)
+
+        return data
@@ -129,7 +129,8 @@ def plot_h3_maps_with_boundaries_and_quartiles(gdf,
                                                boundary_gdf, 
                                                cmap_name='Blues', 
                                                title='Geospatial Distribution of Conflict',
-                                               source_text=""):
+                                               source_text="",
+                                               sketch=None):
     """
     Creates a multi-panel plot of H3 hexagons with a boundary, one panel for each 
     unique category. The color scale is based on global quartiles of the 
@@ -148,6 +149,10 @@ def plot_h3_maps_with_boundaries_and_quartiles(gdf,
         It will be reprojected to match the CRS of `gdf`.
     cmap_name : str, optional
         The name of the colormap to use (e.g., 'Blues'). Defaults to 'Blues'.
+    sketch : QuantileSketch, optional
+        A sketch of the measure (see `quantile_sketch.py`), e.g. merged from
+        per-country or per-quarter sketches. If given, the quartile bin edges are
+        taken from it instead of from the full `measure_column`.
     """
     if gdf.crs is None:
         raise ValueError("The input GeoDataFrame must have a defined Coordinate Reference System (CRS).")
@@ -161,13 +166,18 @@ def plot_h3_maps_with_boundaries_and_quartiles(gdf,
         return
 
     # --- Robust Quartile Calculation ---
-    data_to_bin = gdf[measure_column].dropna()
-    if data_to_bin.empty:
-        print("Warning: The measure column is empty. Cannot plot quartiles.")
-        return
-    
     quantiles = [0.0, 0.25, 0.5, 0.75, 1.0]
-    bin_edges = data_to_bin.quantile(quantiles).tolist()
+    if sketch is not None:
+        if sketch.count == 0:
+            print("Warning: The sketch is empty. Cannot plot quartiles.")
+            return
+        bin_edges = sketch.quantiles(quantiles).tolist()
+    else:
+        data_to_bin = gdf[measure_column].dropna()
+        if data_to_bin.empty:
+            print("Warning: The measure column is empty. Cannot plot quartiles.")
+            return
+        bin_edges = data_to_bin.quantile(quantiles).tolist()
 
     # Ensure bin edges are strictly increasing to prevent BoundaryNorm errors
     for i in range(1, len(bin_edges)):
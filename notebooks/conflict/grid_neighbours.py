@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from template.quadkey_utils import quadkeys_to_tiles
+
+# --- Adjacency Functions ---
+
+def _adjacency(rows: np.ndarray, cols: np.ndarray, n: int) -> sparse.csr_matrix:
+    """Builds a binary n x n CSR matrix from (row, column) pairs."""
+    data = np.ones(len(rows), dtype="float64")
+    adjacency = sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1.0
+    return adjacency
+
+
+def quadkey_neighbours(quadkeys, k: int = 1, zoom: int | None = None, include_self: bool = False) -> sparse.csr_matrix:
+    """
+    Builds the k-ring adjacency of a quadkey grid without any spatial join.
+
+    Neighbours are found arithmetically: a tile's k-ring is every tile whose x and
+    y differ by at most `k`, and each candidate is matched against the grid with a
+    binary search over packed tile ids. Tiles missing from `quadkeys` (e.g. outside
+    a country) are simply not neighbours.
+
+    Args:
+        quadkeys (array-like): String or integer quadkeys of one zoom level, e.g.
+            the `index` column of `MENAP_regional_quadkey12.gpkg`. Must be unique.
+        k (int): Ring size; 1 gives the 8 surrounding tiles.
+        zoom (int | None): Zoom level. Required for integer quadkeys.
+        include_self (bool): Whether each tile is its own neighbour.
+
+    Returns:
+        sparse.csr_matrix: n x n binary adjacency in the order of `quadkeys`.
+    """
+    x, y, zoom = quadkeys_to_tiles(quadkeys, zoom)
+    n = len(x)
+    if n == 0:
+        return sparse.csr_matrix((0, 0))
+    ids = x * (1 << zoom) + y
+    order = np.argsort(ids)
+    sorted_ids = ids[order]
+    if (sorted_ids[1:] == sorted_ids[:-1]).any():
+        raise ValueError("Quadkeys must be unique.")
+
+    offsets = [(dx, dy) for dx in range(-k, k + 1) for dy in range(-k, k + 1)]
+    if not include_self:
+        offsets.remove((0, 0))
+
+    rows, cols = [], []
+    size = 1 << zoom
+    for dx, dy in offsets:
+        nx, ny = x + dx, y + dy
+        inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+        candidate = nx * size + ny
+        position = np.minimum(np.searchsorted(sorted_ids, candidate), n - 1)
+        found = inside & (sorted_ids[position] == candidate)
+        rows.append(np.flatnonzero(found))
+        cols.append(order[position[found]])
+
+    return _adjacency(np.concatenate(rows), np.concatenate(cols), n)
+
+
+def h3_neighbours(cells, k: int = 1, include_self: bool = False) -> sparse.csr_matrix:
+    """
+    Builds the k-ring adjacency of a set of H3 cells.
+
+    Uses H3's own grid arithmetic (`grid_disk`) instead of geometric predicates.
+    Requires the `h3` package (v4).
+
+    Args:
+        cells (array-like): H3 cell ids as strings or integers, e.g. `h3_index`. Must be unique.
+        k (int): Ring size; 1 gives the 6 surrounding cells.
+        include_self (bool): Whether each cell is its own neighbour.
+
+    Returns:
+        sparse.csr_matrix: n x n binary adjacency in the order of `cells`.
+    """
+    import h3
+
+    cells = pd.Index(cells)
+    if not cells.is_unique:
+        raise ValueError("H3 cells must be unique.")
+    as_string = len(cells) > 0 and isinstance(cells[0], str)
+
+    rows, neighbours = [], []
+    for i, cell in enumerate(cells):
+        disk = h3.grid_disk(cell if as_string else h3.int_to_str(int(cell)), k)
+        rows.append(np.full(len(disk), i))
+        neighbours.extend(disk if as_string else [h3.str_to_int(c) for c in disk])
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype="int64")
+    cols = cells.get_indexer(neighbours)
+    keep = cols >= 0
+    if not include_self:
+        keep &= cols != rows
+    return _adjacency(rows[keep], cols[keep], len(cells))
+
+# --- Spatial Lag Functions ---
+
+def spatial_lag(adjacency: sparse.csr_matrix, values, standardize: bool = False) -> np.ndarray:
+    """
+    Sums (or averages) a cell metric over each cell's neighbours.
+
+    Args:
+        adjacency (sparse.csr_matrix): Output of `quadkey_neighbours` or `h3_neighbours`.
+        values (array-like): One value per cell, or a cells x periods matrix to
+            lag every period in one product. Missing values count as 0.
+        standardize (bool): Divide by the number of neighbours (a row-standardised
+            lag, i.e. the neighbourhood mean).
+
+    Returns:
+        np.ndarray: Lagged values, with the same shape as `values`.
+    """
+    values = np.nan_to_num(np.asarray(values, dtype="float64"))
+    lagged = adjacency @ values
+    if standardize:
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            lagged = lagged / (degree[:, None] if lagged.ndim == 2 else degree)
+    return lagged
+
+
+def rolling_sum(matrix: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sums each row of a cells x periods matrix over a trailing window of periods.
+
+    Args:
+        matrix (np.ndarray): Values, with periods in chronological order along axis 1.
+        window (int): Number of periods in the window, including the current one.
+
+    Returns:
+        np.ndarray: Trailing sums, same shape as `matrix`.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1.")
+    cumulative = np.cumsum(np.nan_to_num(matrix), axis=1)
+    result = cumulative.copy()
+    result[:, window:] -= cumulative[:, :-window]
+    return result
+
+
+def neighbourhood_features(
+    data: pd.DataFrame,
+    cell_column: str,
+    time_column: str,
+    value_column: str,
+    adjacency: sparse.csr_matrix,
+    cells,
+    windows: tuple = (),
+    standardize: bool = False,
+) -> pd.DataFrame:
+    """
+    Computes spillover features of a cell metric for every cell and period at once.
+
+    The panel is pivoted to a cells x periods matrix, lagged with one sparse
+    matrix product, and optionally summed over trailing windows of periods.
+    For example, with quarterly `conflict_intensity_index` at quadkey 12:
+
+        # Border tiles appear once per country in the regional boundary file.
+        cells = regional_boundary_quadkey12['index'].unique()
+        adjacency = quadkey_neighbours(cells)
+        features = neighbourhood_features(conflict_regional_quad12_quarter, 'index',
+                                          'event_date', 'nrEvents', adjacency, cells, windows=(4,))
+
+    Args:
+        data (pd.DataFrame): Long panel with one row per cell and period.
+        cell_column (str): Cell id column, matching `cells`.
+        time_column (str): Period column, e.g. 'event_date'.
+        value_column (str): Metric to lag, e.g. 'nrFatalities'.
+        adjacency (sparse.csr_matrix): Adjacency built on `cells`.
+        cells (array-like): Cell ids, in the order used to build `adjacency`.
+        windows (tuple): Trailing window lengths, in periods, for neighbourhood sums.
+        standardize (bool): Use the neighbourhood mean instead of the sum.
+
+    Returns:
+        pd.DataFrame: One row per cell and period with `value_column`,
+            '{value_column}_lag' and '{value_column}_lag_roll{w}' for each window.
+            Cells or periods without data count as 0.
+    """
+    cells = pd.Index(cells)
+    periods = pd.Index(np.sort(data[time_column].unique()))
+
+    row = cells.get_indexer(data[cell_column])
+    col = periods.get_indexer(data[time_column])
+    known = row >= 0
+    matrix = np.zeros((len(cells), len(periods)))
+    np.add.at(matrix, (row[known], col[known]), np.nan_to_num(data[value_column].to_numpy(dtype="float64")[known]))
+
+    lagged = spatial_lag(adjacency, matrix, standardize=standardize)
+    features = {value_column: matrix, f"{value_column}_lag": lagged}
+    for window in windows:
+        features[f"{value_column}_lag_roll{window}"] = rolling_sum(lagged, window)
+
+    index = pd.MultiIndex.from_product([cells, periods], names=[cell_column, time_column])
+    return pd.DataFrame({name: values.ravel() for name, values in features.items()}, index=index).reset_index()
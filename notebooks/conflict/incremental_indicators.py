@@ -0,0 +1,309 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# --- Logger for consistent output ---
+class SimpleLogger:
+    def info(self, message):
+        print(f"INFO: {message}")
+    def error(self, message):
+        print(f"ERROR: {message}")
+
+logger = SimpleLogger()
+
+# Months per period of each supported panel frequency.
+FREQUENCIES = {"M": 1, "Q": 3}
+
+
+def _to_periods(values, freq: str) -> np.ndarray:
+    """Converts dates to integer period numbers (months or quarters since 1970)."""
+    dates = pd.DatetimeIndex(pd.to_datetime(values))
+    months = (dates.year.to_numpy(dtype="int64") - 1970) * 12 + dates.month.to_numpy(dtype="int64") - 1
+    return months // FREQUENCIES[freq]
+
+
+def _to_dates(periods, freq: str) -> pd.DatetimeIndex:
+    """Converts integer period numbers back to the first day of each period."""
+    months = np.asarray(periods, dtype="int64") * FREQUENCIES[freq]
+    return pd.DatetimeIndex((np.datetime64("1970-01", "M") + months).astype("datetime64[ns]"))
+
+
+class IndicatorEngine:
+    """
+    Incremental trend and anomaly indicators for many conflict time series.
+
+    Keeps a small state per series (e.g. per country and event type, or per
+    quadkey cell): the last `window + 1` period values, an EWMA, and the first and
+    last period seen. Feeding a new month or quarter updates only the series
+    present in it, in O(new rows), and the state can be saved and reopened
+    between runs, so indicators never require re-scanning the history.
+
+    Periods without data count as 0 (no events). Series not updated are brought
+    forward lazily when indicators are read. Indicators per metric are:
+
+    - '{metric}': value of the period.
+    - '{metric}_roll{window}': sum over the last `window` periods, including the current one.
+    - '{metric}_ewma': exponentially weighted mean with half-life `halflife` periods.
+    - '{metric}_mean', '{metric}_std': mean and standard deviation of the `window`
+      periods before the current one.
+    - '{metric}_z': z-score of the value against that baseline.
+    - '{metric}_anomaly': z-score of at least `z_threshold`, once the series has
+      `min_periods` periods of history.
+
+    Example:
+        path = "../../data/conflict/indicators_national_monthly.npz"
+        if Path(path).exists():
+            engine = IndicatorEngine.open(path)
+        else:
+            engine = IndicatorEngine(["country", "event_type"], ["nrEvents", "nrFatalities"])
+        engine.update(new_month, time_column="event_date")
+        engine.save(path)
+        engine.hotspots("nrFatalities")
+    """
+
+    def __init__(
+        self,
+        keys: list[str],
+        metrics: list[str],
+        freq: str = "M",
+        window: int = 12,
+        halflife: float = 3.0,
+        z_threshold: float = 3.0,
+        min_periods: int | None = None,
+    ):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"freq must be one of {list(FREQUENCIES)}.")
+        if window < 2:
+            raise ValueError("window must be at least 2.")
+
+        self.keys = list(keys)
+        self.metrics = list(metrics)
+        self.freq = freq
+        self.window = window
+        self.halflife = halflife
+        self.z_threshold = z_threshold
+        self.min_periods = window if min_periods is None else min_periods
+
+        self.index = self._make_index([np.empty(0, dtype=object) for _ in self.keys])
+        self.first = np.empty(0, dtype="int64")
+        self.last = np.empty(0, dtype="int64")
+        self.values = np.empty((0, len(self.metrics), window + 1))
+        self.ewma = np.empty((0, len(self.metrics)))
+
+    @property
+    def alpha(self) -> float:
+        return 1.0 - 0.5 ** (1.0 / self.halflife)
+
+    def _make_index(self, arrays) -> pd.Index:
+        if len(self.keys) == 1:
+            return pd.Index(arrays[0], name=self.keys[0])
+        return pd.MultiIndex.from_arrays(arrays, names=self.keys)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __repr__(self):
+        return (f"IndicatorEngine(keys={self.keys}, metrics={self.metrics}, freq='{self.freq}', "
+                f"window={self.window}, series={len(self)})")
+
+    # --- State Functions ---
+
+    def _shift(self, series: np.ndarray, period: int) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the values and EWMA of `series` carried forward to `period`, filling gaps with 0."""
+        gap = period - self.last[series]
+        columns = np.arange(self.window + 1) + gap[:, None]
+        shifted = np.take_along_axis(
+            self.values[series], np.minimum(columns, self.window)[:, None, :], axis=2
+        )
+        shifted[np.broadcast_to((columns > self.window)[:, None, :], shifted.shape)] = 0.0
+        ewma = self.ewma[series] * ((1.0 - self.alpha) ** gap)[:, None]
+        return shifted, ewma
+
+    def _series(self, keys: pd.DataFrame, period: int) -> np.ndarray:
+        """Returns the positions of the series of `keys`, adding series not seen before."""
+        index = self._make_index([keys[k].to_numpy() for k in self.keys])
+        positions = self.index.get_indexer(index)
+        new = positions < 0
+        if new.any():
+            added = index[new]
+            positions[new] = np.arange(len(self.index), len(self.index) + len(added))
+            self.index = self.index.append(added)
+            self.first = np.concatenate([self.first, np.full(len(added), period)])
+            self.last = np.concatenate([self.last, np.full(len(added), period)])
+            self.values = np.concatenate([self.values, np.zeros((len(added),) + self.values.shape[1:])])
+            self.ewma = np.concatenate([self.ewma, np.zeros((len(added), len(self.metrics)))])
+        return positions
+
+    def update(self, data: pd.DataFrame, time_column: str = "event_date") -> pd.DataFrame:
+        """
+        Adds new periods of data to the state.
+
+        Rows are summed per series and period, so `data` may be a panel (one row per
+        series and period, e.g. `conflict_national_events_monthly_*.csv`) or raw events
+        with a count column. Each period in `data` is taken as that period's complete
+        total: data for a series' latest period replaces it, so re-sending the current
+        month is idempotent. Data older than a series' latest period raises, because
+        it cannot be applied incrementally; rebuild the engine from the full panel instead.
+
+        Args:
+            data (pd.DataFrame): New rows with the key, time and metric columns.
+            time_column (str): Date column of the rows.
+
+        Returns:
+            pd.DataFrame: Indicators of the updated series at each period in `data`.
+        """
+        frame = data[self.keys + self.metrics].copy()
+        frame["_period"] = _to_periods(data[time_column], self.freq)
+        frame[self.metrics] = frame[self.metrics].fillna(0)
+        totals = frame.groupby(self.keys + ["_period"], sort=False)[self.metrics].sum().reset_index()
+
+        known = self.index.get_indexer(self._make_index([totals[k].to_numpy() for k in self.keys]))
+        late = totals["_period"].to_numpy()[known >= 0] < self.last[known[known >= 0]]
+        if late.any():
+            raise ValueError(
+                f"{late.sum()} rows are older than the latest period of their series. "
+                "Rebuild the engine from the full panel to apply revisions."
+            )
+
+        results = []
+        for period, rows in totals.groupby("_period", sort=True):
+            series = self._series(rows, period)
+            values, ewma = self._shift(series, period)
+            new = rows[self.metrics].to_numpy(dtype="float64")
+
+            # Replace the period's value; the first period of a series starts the EWMA at its value.
+            weight = np.where(self.first[series] == period, 1.0, self.alpha)[:, None]
+            ewma += weight * (new - values[:, :, -1])
+            values[:, :, -1] = new
+
+            self.values[series] = values
+            self.ewma[series] = ewma
+            self.last[series] = period
+            results.append(self._indicators(series, values, ewma, period))
+
+        logger.info(f"Updated {len(totals)} series-periods; {len(self)} series in the state.")
+        if not results:
+            return self._indicators(np.empty(0, dtype="int64"), self.values[:0], self.ewma[:0], 0)
+        return pd.concat(results, ignore_index=True)
+
+    # --- Indicator Functions ---
+
+    def _indicators(self, series: np.ndarray, values: np.ndarray, ewma: np.ndarray, period: int) -> pd.DataFrame:
+        current = values[:, :, -1]
+        history = values[:, :, :-1]
+        mean = history.mean(axis=2)
+        std = history.std(axis=2, ddof=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = (current - mean) / std
+        z[(std == 0) & (current == mean)] = 0.0
+        observed = np.minimum(period - self.first[series], self.window) >= self.min_periods
+
+        index = self.index[series]
+        frame = index.to_frame(index=False) if len(self.keys) > 1 else pd.DataFrame({self.keys[0]: np.asarray(index)})
+        frame["period"] = _to_dates(np.full(len(series), period), self.freq)
+        for i, metric in enumerate(self.metrics):
+            frame[metric] = current[:, i]
+            frame[f"{metric}_roll{self.window}"] = values[:, i, 1:].sum(axis=1)
+            frame[f"{metric}_ewma"] = ewma[:, i]
+            frame[f"{metric}_mean"] = mean[:, i]
+            frame[f"{metric}_std"] = std[:, i]
+            frame[f"{metric}_z"] = z[:, i]
+            frame[f"{metric}_anomaly"] = (z[:, i] >= self.z_threshold) & observed
+        return frame
+
+    @property
+    def latest_period(self) -> pd.Timestamp | None:
+        """First day of the latest period seen by any series."""
+        return _to_dates([self.last.max()], self.freq)[0] if len(self) else None
+
+    def snapshot(self, period=None) -> pd.DataFrame:
+        """
+        Returns the indicators of every series at one period.
+
+        Series without data since their latest period are carried forward with zeros.
+        The state itself is not modified.
+
+        Args:
+            period (date-like | None): Period to report. Defaults to `latest_period`.
+                Must not be before any series' latest period.
+
+        Returns:
+            pd.DataFrame: One row per series, with the key columns, 'period' and the indicators.
+        """
+        if not len(self):
+            raise ValueError("The engine has no data yet.")
+        period = self.last.max() if period is None else int(_to_periods([period], self.freq)[0])
+        if period < self.last.max():
+            raise ValueError("Cannot report a period before the latest update.")
+
+        series = np.arange(len(self))
+        values, ewma = self._shift(series, period)
+        return self._indicators(series, values, ewma, period)
+
+    def hotspots(self, metric: str, period=None) -> pd.DataFrame:
+        """
+        Returns the series flagged as anomalous on `metric`, strongest first.
+
+        Args:
+            metric (str): One of `metrics`, e.g. 'nrFatalities'.
+            period (date-like | None): Period to report. Defaults to `latest_period`.
+
+        Returns:
+            pd.DataFrame: Rows of `snapshot` with '{metric}_anomaly', sorted by z-score.
+        """
+        snapshot = self.snapshot(period)
+        flagged = snapshot[snapshot[f"{metric}_anomaly"]]
+        return flagged.sort_values(f"{metric}_z", ascending=False).reset_index(drop=True)
+
+    # --- Persistence Functions ---
+
+    def save(self, path: str | Path):
+        """
+        Saves the state to a compressed .npz file, replacing it atomically.
+
+        Args:
+            path (str | Path): Output file, e.g. '../../data/conflict/indicators.npz'.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            "keys": self.keys,
+            "metrics": self.metrics,
+            "freq": self.freq,
+            "window": self.window,
+            "halflife": self.halflife,
+            "z_threshold": self.z_threshold,
+            "min_periods": self.min_periods,
+        }
+        levels = [self.index.get_level_values(k).to_numpy() for k in self.keys]
+        arrays = {f"key_{i}": v.astype(str) if v.dtype == object else v for i, v in enumerate(levels)}
+
+        temporary = path.with_name(f"{path.name}.tmp")
+        with open(temporary, "wb") as f:
+            np.savez_compressed(
+                f, metadata=json.dumps(metadata), first=self.first, last=self.last,
+                values=self.values, ewma=self.ewma, **arrays,
+            )
+        temporary.replace(path)
+
+    @classmethod
+    def open(cls, path: str | Path) -> "IndicatorEngine":
+        """
+        Opens a state saved with `save`.
+
+        Args:
+            path (str | Path): File written by `save`.
+
+        Returns:
+            IndicatorEngine: The engine, ready for further updates.
+        """
+        with np.load(path) as state:
+            engine = cls(**json.loads(str(state["metadata"])))
+            engine.index = engine._make_index([state[f"key_{i}"] for i in range(len(engine.keys))])
+            engine.first = state["first"]
+            engine.last = state["last"]
+            engine.values = state["values"]
+            engine.ewma = state["ewma"]
+        return engine
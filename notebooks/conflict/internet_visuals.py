@@ -1,129 +1,188 @@
 from bokeh.plotting import figure, show
-from bokeh.models import TabPanel, Tabs, LinearAxis, Range1d
+from bokeh.models import TabPanel, Tabs, LinearAxis, Range1d, ColumnDataSource, CDSView, GroupFilter
 from bokeh.layouts import column
 from bokeh.io import output_notebook
+from bokeh.embed import file_html
+from bokeh.resources import CDN
+from pathlib import Path
+import time
 import pandas as pd
 
+# Left-axis metric of each dashboard variant, with its labels and colours.
+DUAL_AXIS_METRICS = {
+    'conflict_intensity_index': {
+        'title': 'Conflict Metrics',
+        'axis_label': 'Conflict Intensity Index',
+        'legend_label': 'Conflict Intensity',
+        'color': 'red',
+        'download_color': 'blue',
+    },
+    'nrFatalities': {
+        'title': 'Fatalities',
+        'axis_label': 'Number of Fatalities',
+        'legend_label': 'Fatalities',
+        'color': 'darkred',
+        'download_color': 'steelblue',
+    },
+}
+
+def _country_sources(df, metrics):
+    """
+    Builds the data sources shared by every tab, in one pass over `df`.
+
+    Rows are sorted once by country and date, and only the plotted columns are kept,
+    as NumPy arrays so that Bokeh embeds them in binary form. Markers use one row per
+    observation; lines use one row per country, because Bokeh cannot filter
+    connected glyphs such as `line` with a CDSView but can filter `multi_line`.
+    The caller's frame is not modified.
+
+    Returns:
+        tuple: The marker and line ColumnDataSources, the countries in order of
+            appearance, and a DataFrame with the min/max download speed per country.
+    """
+    columns = ['country', 'date', 'download_speed'] + [m for m in metrics if m != 'download_speed']
+    data = df[columns].copy()
+    data['date'] = pd.to_datetime(data['date'])
+
+    countries = data['country'].unique()
+    data = data.sort_values(['country', 'date'], kind='stable')
+    download_range = data.groupby('country', sort=False)['download_speed'].agg(['min', 'max'])
+
+    points = ColumnDataSource({c: data[c].to_numpy() for c in columns})
+
+    values = {c: data[c].to_numpy() for c in columns[1:]}
+    starts = data['country'].ne(data['country'].shift()).to_numpy().nonzero()[0]
+    ends = list(starts[1:]) + [len(data)]
+    lines = ColumnDataSource({
+        'country': data['country'].to_numpy()[starts],
+        **{c: [v[start:end] for start, end in zip(starts, ends)] for c, v in values.items()},
+    })
+
+    return points, lines, countries, download_range
+
+def _dual_axis_figure(points, lines, view, country, metric, download_min, download_max):
+    """Creates one country's dual-axis figure from the shared sources and its view."""
+    info = DUAL_AXIS_METRICS[metric]
+
+    # Create figure with left y-axis for the conflict metric
+    p = figure(
+        title=f"{info['title']} vs Download Speed - {country}",
+        x_axis_label='Date',
+        y_axis_label=info['axis_label'],
+        x_axis_type='datetime',
+        width=800,
+        height=400,
+        tools="pan,wheel_zoom,box_zoom,reset,save"
+    )
+
+    # Plot the conflict metric on left axis (primary)
+    p.multi_line('date', metric, source=lines, view=view, line_width=2, color=info['color'], alpha=0.8,
+                 legend_label=info['legend_label'])
+    p.scatter('date', metric, source=points, view=view, size=6, color=info['color'], alpha=0.6)
+
+    # Set up right y-axis for download speed
+    download_padding = (download_max - download_min) * 0.1
+    p.extra_y_ranges = {
+        "download": Range1d(
+            start=download_min - download_padding,
+            end=download_max + download_padding
+        )
+    }
+    p.add_layout(
+        LinearAxis(
+            y_range_name="download",
+            axis_label="Download Speed (Mbps)"
+        ),
+        'right'
+    )
+
+    # Plot download speed on right axis
+    p.multi_line('date', 'download_speed', source=lines, view=view, line_width=2, color=info['download_color'],
+                 alpha=0.8, y_range_name="download", legend_label='Download Speed')
+    p.scatter('date', 'download_speed', source=points, view=view, size=6, color=info['download_color'],
+              alpha=0.6, y_range_name="download")
+
+    # Customize the plot
+    p.legend.location = "top_left"
+    p.legend.click_policy = "hide"
+    p.title.text_font_size = "14pt"
+    p.xaxis.axis_label_text_font_size = "12pt"
+    p.yaxis.axis_label_text_font_size = "12pt"
+
+    # Add grid
+    p.grid.grid_line_alpha = 0.3
+
+    return p
+
+def _country_tabs(points, lines, views, countries, download_range, metric):
+    """Creates the country Tabs of one metric, all drawing from the shared sources."""
+    tab_panels = [
+        TabPanel(
+            child=_dual_axis_figure(
+                points, lines, views[country], country, metric,
+                download_range.at[country, 'min'], download_range.at[country, 'max']
+            ),
+            title=country
+        )
+        for country in countries
+    ]
+    return Tabs(tabs=tab_panels)
+
+def create_dual_axis_dashboard(df, metrics=('conflict_intensity_index', 'nrFatalities')):
+    """
+    Creates a dashboard of country tabs for several conflict metrics from one pass over the data.
+
+    The data is grouped once, and every tab of every metric draws from the same
+    shared ColumnDataSources, selecting its country with a CDSView/GroupFilter.
+    Each value is therefore embedded once in the output instead of once per glyph
+    and country.
+
+    Args:
+        df (pd.DataFrame): DataFrame with columns: 'date', 'country', 'download_speed'
+                           and the metrics to plot.
+        metrics (tuple): Left-axis metrics, keys of `DUAL_AXIS_METRICS`.
+
+    Returns:
+        Tabs: Bokeh Tabs widget with one tab per metric, each holding the country tabs.
+    """
+    points, lines, countries, download_range = _country_sources(df, metrics)
+
+    # One view per country, shared by the metrics.
+    views = {
+        country: CDSView(filter=GroupFilter(column_name='country', group=country))
+        for country in countries
+    }
+
+    return Tabs(tabs=[
+        TabPanel(
+            child=_country_tabs(points, lines, views, countries, download_range, metric),
+            title=DUAL_AXIS_METRICS[metric]['legend_label']
+        )
+        for metric in metrics
+    ])
+
+def _single_metric_tabs(df, metric):
+    points, lines, countries, download_range = _country_sources(df, (metric,))
+    views = {
+        country: CDSView(filter=GroupFilter(column_name='country', group=country))
+        for country in countries
+    }
+    return _country_tabs(points, lines, views, countries, download_range, metric)
+
 def create_dual_axis_country_tabs(df):
     """
     Creates a Bokeh plot with tabs for each country, showing dual-axis plots
     with conflict metrics on left axis and download speed on right axis.
-    
+
     Args:
-        df (pd.DataFrame): DataFrame with columns: 'date', 'index', 'population', 
-                          'country', 'download_speed', 'conflict_intensity_index', 
+        df (pd.DataFrame): DataFrame with columns: 'date', 'index', 'population',
+                          'country', 'download_speed', 'conflict_intensity_index',
                           'nrFatalities', 'nrEvents'
-    
+
     Returns:
         Tabs: Bokeh Tabs widget with country plots
     """
-    
-    # Ensure date is datetime
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Get unique countries
-    countries = df['country'].unique()
-    
-    tab_panels = []
-    
-    for country in countries:
-        # Filter data for this country
-        country_data = df[df['country'] == country].sort_values('date')
-        
-        if country_data.empty:
-            continue
-            
-        # Create figure with left y-axis for conflict metrics
-        p = figure(
-            title=f"Conflict Metrics vs Download Speed - {country}",
-            x_axis_label='Date',
-            y_axis_label='Conflict Intensity Index',
-            x_axis_type='datetime',
-            width=800,
-            height=400,
-            tools="pan,wheel_zoom,box_zoom,reset,save"
-        )
-        
-        # Plot conflict intensity on left axis (primary)
-        conflict_line = p.line(
-            country_data['date'], 
-            country_data['conflict_intensity_index'],
-            line_width=2,
-            color='red',
-            alpha=0.8,
-            legend_label='Conflict Intensity'
-        )
-        
-        conflict_circle = p.scatter(
-            country_data['date'],
-            country_data['conflict_intensity_index'],
-            size=6,
-            color='red',
-            alpha=0.6
-        )
-        
-        # Set up right y-axis for download speed
-        # First, determine the range for download speed
-        download_min = country_data['download_speed'].min()
-        download_max = country_data['download_speed'].max()
-        download_range = download_max - download_min
-        download_padding = download_range * 0.1
-        
-        # Create right y-axis
-        p.extra_y_ranges = {
-            "download": Range1d(
-                start=download_min - download_padding,
-                end=download_max + download_padding
-            )
-        }
-        
-        # Add right y-axis
-        p.add_layout(
-            LinearAxis(
-                y_range_name="download",
-                axis_label="Download Speed (Mbps)"
-            ), 
-            'right'
-        )
-        
-        # Plot download speed on right axis
-        download_line = p.line(
-            country_data['date'],
-            country_data['download_speed'],
-            line_width=2,
-            color='blue',
-            alpha=0.8,
-            y_range_name="download",
-            legend_label='Download Speed'
-        )
-        
-        download_circle = p.scatter(
-            country_data['date'],
-            country_data['download_speed'],
-            size=6,
-            color='blue',
-            alpha=0.6,
-            y_range_name="download"
-        )
-        
-        # Customize the plot
-        p.legend.location = "top_left"
-        p.legend.click_policy = "hide"
-        p.title.text_font_size = "14pt"
-        p.xaxis.axis_label_text_font_size = "12pt"
-        p.yaxis.axis_label_text_font_size = "12pt"
-        
-        # Add grid
-        p.grid.grid_line_alpha = 0.3
-        
-        # Create tab panel for this country
-        tab_panel = TabPanel(child=p, title=country)
-        tab_panels.append(tab_panel)
-    
-    # Create tabs widget
-    tabs = Tabs(tabs=tab_panels)
-    
-    return tabs
+    return _single_metric_tabs(df, 'conflict_intensity_index')
 
 # Alternative version with fatalities instead of conflict intensity
 def create_dual_axis_country_tabs_fatalities(df):
@@ -131,109 +190,27 @@ def create_dual_axis_country_tabs_fatalities(df):
     Creates a Bokeh plot with tabs for each country, showing dual-axis plots
     with fatalities on left axis and download speed on right axis.
     """
-    
-    # Ensure date is datetime
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Get unique countries
-    countries = df['country'].unique()
-    
-    tab_panels = []
-    
-    for country in countries:
-        # Filter data for this country
-        country_data = df[df['country'] == country].sort_values('date')
-        
-        if country_data.empty:
-            continue
-            
-        # Create figure with left y-axis for fatalities
-        p = figure(
-            title=f"Fatalities vs Download Speed - {country}",
-            x_axis_label='Date',
-            y_axis_label='Number of Fatalities',
-            x_axis_type='datetime',
-            width=800,
-            height=400,
-            tools="pan,wheel_zoom,box_zoom,reset,save"
-        )
-        
-        # Plot fatalities on left axis (primary)
-        fatalities_line = p.line(
-            country_data['date'], 
-            country_data['nrFatalities'],
-            line_width=2,
-            color='darkred',
-            alpha=0.8,
-            legend_label='Fatalities'
-        )
-        
-        fatalities_circle = p.circle(
-            country_data['date'],
-            country_data['nrFatalities'],
-            size=6,
-            color='darkred',
-            alpha=0.6
-        )
-        
-        # Set up right y-axis for download speed
-        download_min = country_data['download_speed'].min()
-        download_max = country_data['download_speed'].max()
-        download_range = download_max - download_min
-        download_padding = download_range * 0.1
-        
-        # Create right y-axis
-        p.extra_y_ranges = {
-            "download": Range1d(
-                start=download_min - download_padding,
-                end=download_max + download_padding
-            )
-        }
-        
-        # Add right y-axis
-        p.add_layout(
-            LinearAxis(
-                y_range_name="download",
-                axis_label="Download Speed (Mbps)"
-            ), 
-            'right'
-        )
-        
-        # Plot download speed on right axis
-        download_line = p.line(
-            country_data['date'],
-            country_data['download_speed'],
-            line_width=2,
-            color='steelblue',
-            alpha=0.8,
-            y_range_name="download",
-            legend_label='Download Speed'
-        )
-        
-        download_circle = p.circle(
-            country_data['date'],
-            country_data['download_speed'],
-            size=6,
-            color='steelblue',
-            alpha=0.6,
-            y_range_name="download"
-        )
-        
-        # Customize the plot
-        p.legend.location = "top_left"
-        p.legend.click_policy = "hide"
-        p.title.text_font_size = "14pt"
-        p.xaxis.axis_label_text_font_size = "12pt"
-        p.yaxis.axis_label_text_font_size = "12pt"
-        
-        # Add grid
-        p.grid.grid_line_alpha = 0.3
-        
-        # Create tab panel for this country
-        tab_panel = TabPanel(child=p, title=country)
-        tab_panels.append(tab_panel)
-    
-    # Create tabs widget
-    tabs = Tabs(tabs=tab_panels)
-    
-    return tabs
+    return _single_metric_tabs(df, 'nrFatalities')
+
+def save_dashboard(layout, filename, title='Conflict and Internet Dashboard'):
+    """
+    Saves a Bokeh layout as a standalone HTML file and reports its size and render time.
+
+    Args:
+        layout: Bokeh layout, e.g. the Tabs from `create_dual_axis_dashboard`.
+        filename (str | Path): Output HTML file.
+        title (str): HTML page title.
+
+    Returns:
+        dict: 'path', 'size_bytes' and 'render_seconds' of the generated HTML.
+    """
+    start = time.perf_counter()
+    html = file_html(layout, CDN, title)
+    render_seconds = time.perf_counter() - start
+
+    path = Path(filename)
+    path.write_text(html, encoding='utf-8')
+    size_bytes = path.stat().st_size
+    print(f"Saved {path}: {size_bytes / 1024:,.1f} KiB, rendered in {render_seconds:.2f} s")
+
+    return {'path': path, 'size_bytes': size_bytes, 'render_seconds': render_seconds}
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+
+class QuantileSketch:
+    """
+    Mergeable KLL sketch for approximate quantiles, ranks and histograms.
+
+    A sketch summarises a numeric column in O(k log(n/k)) memory. Sketches built
+    separately (per country, quarter or file, possibly in parallel processes) can
+    be merged into one that is as accurate as a sketch built over all the data,
+    so region-wide bin edges never require the full column in memory.
+
+    The rank error of any quantile is at most `rank_error()` (a fraction of the
+    count) with 99% confidence; min, max and count are exact.
+
+    Example:
+        sketches = [QuantileSketch().update(gdf['conflict_intensity_index']) for gdf in parts]
+        sketch = QuantileSketch.merge_all(sketches)
+        sketch.quantiles([0, 0.25, 0.5, 0.75, 1])
+    """
+
+    def __init__(self, k: int = 200, seed: int | None = None):
+        if k < 8:
+            raise ValueError("k must be at least 8.")
+        self.k = k
+        self.count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(8, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _compress(self):
+        """Compacts the lowest over-full level until the sketch fits its capacity."""
+        while True:
+            for level, items in enumerate(self.levels):
+                if len(items) > self._capacity(level):
+                    break
+            else:
+                return
+
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            items = np.sort(items)
+            # An odd item stays at this level; the rest are halved, keeping odd or even positions at random.
+            keep, items = items[: len(items) % 2], items[len(items) % 2:]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values) -> "QuantileSketch":
+        """
+        Adds values to the sketch. Missing and infinite values are ignored.
+
+        Args:
+            values (array-like): Values to add, e.g. a DataFrame column.
+
+        Returns:
+            QuantileSketch: The sketch itself, for chaining.
+        """
+        values = np.asarray(values, dtype="float64").ravel()
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.min = np.nanmin([self.min, values.min()])
+        self.max = np.nanmax([self.max, values.max()])
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Merges another sketch into this one.
+
+        Args:
+            other (QuantileSketch): Sketch of another partition of the data.
+
+        Returns:
+            QuantileSketch: The sketch itself, for chaining.
+        """
+        if other.count == 0:
+            return self
+        self.k = min(self.k, other.k)
+        self.count += other.count
+        self.min = np.nanmin([self.min, other.min])
+        self.max = np.nanmax([self.max, other.max])
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches, k: int = 200) -> "QuantileSketch":
+        """Merges an iterable of sketches into a new one."""
+        merged = cls(k=k)
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    @classmethod
+    def from_groups(cls, data: pd.DataFrame, column: str, by: str | list[str], k: int = 200) -> pd.Series:
+        """
+        Builds one sketch per group, e.g. per country or quarter.
+
+        Args:
+            data (pd.DataFrame): Input data.
+            column (str): Numeric column to summarise.
+            by (str | list[str]): Grouping column(s).
+            k (int): Accuracy parameter of each sketch.
+
+        Returns:
+            pd.Series: A QuantileSketch per group, indexed by the group keys.
+        """
+        return data.groupby(by)[column].agg(lambda values: cls(k=k).update(values.to_numpy()))
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2.0 ** level) for level, v in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, weights = items[order], weights[order]
+        # Rescale so that the weights add up to the exact count.
+        cumulative = np.cumsum(weights) * (self.count / weights.sum())
+        return items, cumulative
+
+    def rank_error(self) -> float:
+        """
+        Returns the normalised rank error bound (99% confidence) of a quantile query.
+
+        Uses the empirical KLL bound from Apache DataSketches, 2.296 / k^0.9723.
+        Single-level sketches (fewer than about k values) are exact.
+        """
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+    def histogram_error(self) -> float:
+        """Returns the normalised error bound (99% confidence) of each histogram bin mass."""
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.446 / self.k ** 0.9433
+
+    def quantiles(self, q) -> np.ndarray:
+        """
+        Returns approximate quantiles. Quantiles 0 and 1 are the exact min and max.
+
+        Args:
+            q (float | array-like): Quantile(s) in [0, 1].
+
+        Returns:
+            np.ndarray: Value at each quantile.
+        """
+        q = np.atleast_1d(np.asarray(q, dtype="float64"))
+        if ((q < 0) | (q > 1)).any():
+            raise ValueError("Quantiles must be between 0 and 1.")
+        if self.count == 0:
+            return np.full(len(q), np.nan)
+
+        items, cumulative = self._weighted_items()
+        index = np.searchsorted(cumulative, q * self.count, side="left")
+        result = items[np.minimum(index, len(items) - 1)]
+        result[q == 0] = self.min
+        result[q == 1] = self.max
+        return result
+
+    def rank(self, values) -> np.ndarray:
+        """
+        Returns the approximate fraction of values less than or equal to each input.
+
+        Args:
+            values (array-like): Values to rank.
+
+        Returns:
+            np.ndarray: Normalised ranks in [0, 1].
+        """
+        values = np.atleast_1d(np.asarray(values, dtype="float64"))
+        if self.count == 0:
+            return np.full(len(values), np.nan)
+
+        items, cumulative = self._weighted_items()
+        index = np.searchsorted(items, values, side="right")
+        return np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0.0) / self.count
+
+    def histogram(self, bin_edges) -> pd.DataFrame:
+        """
+        Returns approximate counts of values per bin, with their error bounds.
+
+        Bins are closed on the right, except the first, which also includes its left edge.
+
+        Args:
+            bin_edges (array-like): Increasing bin edges.
+
+        Returns:
+            pd.DataFrame: 'lower', 'upper', 'count' and 'count_error' (99% bound) per bin.
+        """
+        bin_edges = np.asarray(bin_edges, dtype="float64")
+        ranks = self.rank(bin_edges) * self.count
+        # Include values equal to the first edge in the first bin.
+        ranks[0] = self.rank(np.nextafter(bin_edges[0], -np.inf))[0] * self.count
+        counts = np.diff(ranks)
+        error = self.histogram_error() * self.count
+        return pd.DataFrame({
+            "lower": bin_edges[:-1],
+            "upper": bin_edges[1:],
+            "count": counts,
+            "count_error": np.full(len(counts), error),
+        })
+
+    def cache_key(self) -> tuple:
+        """Returns the content defining the sketch, used to key cached figures in `report_builder`."""
+        return (self.k, self.count, self.min, self.max, self.levels)
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"QuantileSketch(k={self.k}, count={self.count}, retained={sum(len(v) for v in self.levels)})"
@@ -0,0 +1,270 @@
+import hashlib
+import inspect
+import json
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+# --- Logger for consistent output ---
+class SimpleLogger:
+    def info(self, message):
+        print(f"INFO: {message}")
+    def error(self, message):
+        print(f"ERROR: {message}")
+
+logger = SimpleLogger()
+
+# Argument types whose repr fully describes their value.
+HASHABLE_SCALARS = (bool, int, float, complex, bytes, np.generic, date, datetime, timedelta,
+                    pd.Timestamp, pd.Timedelta, pd.Period)
+
+# Bump to invalidate every cached figure, e.g. after changing the rendering below.
+CACHE_VERSION = 2
+
+
+@dataclass
+class FigureJob:
+    """
+    One figure of the report.
+
+    Args:
+        name (str): Output file name, without extension.
+        function (Callable): Module-level plotting function, e.g.
+            `plot_dual_metrics_by_country`. It may return a matplotlib Figure or a
+            Bokeh model; if it returns None (e.g. after `plt.show()`), the current
+            matplotlib figure is saved.
+        kwargs (dict): Keyword arguments of `function`, including its data.
+        format (str): 'png', 'svg' or 'pdf' for matplotlib, 'html' for Bokeh.
+    """
+    name: str
+    function: Callable
+    kwargs: dict = field(default_factory=dict)
+    format: str = "png"
+
+# --- Hashing Functions ---
+
+def _update_hash(hasher, value):
+    """Feeds a plotting argument into `hasher`, by content rather than identity."""
+    if isinstance(value, pd.DataFrame):
+        frame = pd.DataFrame(value).copy(deep=False)
+        for column in frame.columns:
+            if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                continue
+            if frame[column].dtype == object or str(frame[column].dtype) == "geometry":
+                # Geometries are hashed through their WKB.
+                frame[column] = [v.wkb if hasattr(v, "wkb") else v for v in frame[column]]
+        hasher.update(repr((list(frame.columns), [str(t) for t in value.dtypes])).encode())
+        hasher.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+        if getattr(value, "crs", None) is not None:
+            hasher.update(value.crs.to_string().encode())
+    elif isinstance(value, pd.Series):
+        _update_hash(hasher, value.to_frame())
+    elif isinstance(value, np.ndarray):
+        hasher.update(repr((value.dtype.str, value.shape)).encode())
+        if value.dtype == object:
+            # The bytes of an object array are pointers; hash the items instead.
+            _update_hash(hasher, value.ravel().tolist())
+        else:
+            hasher.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=repr):
+            hasher.update(repr(key).encode())
+            _update_hash(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_hash(hasher, item)
+    elif isinstance(value, (str, Path)):
+        hasher.update(f"{type(value).__name__}:{value}".encode())
+        # Paths, given as Path or as plain strings like '../../data/...', are hashed by content.
+        if _is_file(value):
+            hasher.update(hashlib.sha256(Path(value).read_bytes()).digest())
+    elif isinstance(value, (set, frozenset)):
+        _update_hash(hasher, sorted(value, key=repr))
+    elif hasattr(value, "cache_key"):
+        # Objects such as QuantileSketch expose the content that defines them.
+        hasher.update(f"{type(value).__module__}.{type(value).__qualname__}".encode())
+        _update_hash(hasher, value.cache_key())
+    elif hasattr(value, "wkb"):
+        hasher.update(value.wkb)
+    elif value is None or isinstance(value, HASHABLE_SCALARS):
+        hasher.update(f"{type(value).__name__}:{value!r}".encode())
+    elif callable(value):
+        _update_hash_function(hasher, value)
+    else:
+        # A repr may hide the content (or show a memory address), which would corrupt the cache.
+        raise TypeError(
+            f"Cannot hash a plotting argument of type {type(value).__name__}; "
+            "pass its data instead, or give it a cache_key() method."
+        )
+
+
+def _is_file(value: str | Path) -> bool:
+    try:
+        return Path(value).is_file()
+    except (OSError, ValueError):
+        return False
+
+
+def _update_hash_function(hasher, function):
+    """
+    Feeds a function into `hasher` by the source of its whole module.
+
+    A plotting function often only wraps private helpers and constants of its
+    module (e.g. `create_dual_axis_country_tabs` and `DUAL_AXIS_METRICS`), so
+    editing any of them must change the key. Functions without a module file
+    (e.g. defined in a notebook) are hashed by their own source.
+    """
+    hasher.update(f"{function.__module__}.{function.__qualname__}".encode())
+    for source in (inspect.getmodule(function), function):
+        try:
+            hasher.update(inspect.getsource(source).encode())
+            return
+        except (OSError, TypeError):
+            continue
+
+
+def figure_key(job: FigureJob, dpi: int) -> str:
+    """
+    Returns the content hash of a figure: its function's module source, arguments and output settings.
+
+    Arguments are hashed by content: DataFrames and arrays by their values, files
+    (given as Path or string) by their bytes, and other objects through a
+    `cache_key()` method. Arguments of any other type raise a TypeError.
+
+    Args:
+        job (FigureJob): The figure.
+        dpi (int): Resolution of raster outputs.
+
+    Returns:
+        str: Hex digest identifying the rendered output.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(repr((CACHE_VERSION, job.format, dpi)).encode())
+    _update_hash_function(hasher, job.function)
+    try:
+        _update_hash(hasher, job.kwargs)
+    except TypeError as e:
+        raise TypeError(f"Figure '{job.name}': {e}") from e
+    return hasher.hexdigest()
+
+# --- Rendering Functions ---
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _render(job: FigureJob, path: Path, dpi: int) -> float:
+    """Renders one figure to `path` in a worker process and returns the elapsed time."""
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    try:
+        result = job.function(**job.kwargs)
+
+        if job.format == "html":
+            from bokeh.embed import file_html
+            from bokeh.resources import CDN
+
+            path.write_text(file_html(result, CDN, job.name), encoding="utf-8")
+        else:
+            fig = result if isinstance(result, plt.Figure) else plt.gcf()
+            fig.savefig(path, dpi=dpi, bbox_inches="tight", format=job.format)
+    finally:
+        plt.close("all")
+
+    return time.perf_counter() - start
+
+
+def _temporary_path(cached: Path, job: FigureJob) -> Path:
+    return cached.with_name(f"{cached.stem}.{job.name}.tmp")
+
+
+def build_figures(
+    jobs: list[FigureJob],
+    output_dir: str | Path = "../../reports/figures",
+    cache_dir: str | Path | None = None,
+    max_workers: int | None = None,
+    dpi: int = 150,
+    force: bool = False,
+) -> pd.DataFrame:
+    """
+    Renders the report figures headlessly in a process pool, skipping unchanged ones.
+
+    Every figure is keyed on a hash of its plotting function's source, its arguments
+    (DataFrames are hashed by content) and its output settings. Renders are stored
+    in `cache_dir` under that key, so a figure whose inputs did not move is copied
+    from the cache instead of being drawn again. Workers use the Agg backend.
+
+    Args:
+        jobs (list[FigureJob]): Figures to build. Names must be unique.
+        output_dir (str | Path): Directory receiving `{name}.{format}` files.
+        cache_dir (str | Path | None): Content-addressed render store.
+            Defaults to `output_dir/.cache`.
+        max_workers (int | None): Number of worker processes. Defaults to the CPU count.
+        dpi (int): Resolution of raster outputs.
+        force (bool): Render every figure, ignoring the cache.
+
+    Returns:
+        pd.DataFrame: One row per figure with its 'name', 'key', 'status'
+            ('cached', 'rendered' or 'failed'), 'path' and render 'seconds'.
+    """
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Figure names must be unique.")
+
+    output_dir = Path(output_dir)
+    cache_dir = Path(cache_dir) if cache_dir is not None else output_dir / ".cache"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    summary = []
+    pending = []
+    for job in jobs:
+        key = figure_key(job, dpi)
+        cached = cache_dir / f"{key}.{job.format}"
+        output = output_dir / f"{job.name}.{job.format}"
+        if cached.exists() and not force:
+            shutil.copyfile(cached, output)
+            summary.append({"name": job.name, "key": key, "status": "cached", "path": output, "seconds": 0.0})
+        else:
+            pending.append((job, key, cached, output))
+
+    logger.info(f"{len(jobs) - len(pending)} figures unchanged, rendering {len(pending)}.")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+            futures = {
+                executor.submit(_render, job, _temporary_path(cached, job), dpi): (job, key, cached, output)
+                for job, key, cached, output in pending
+            }
+            for future in as_completed(futures):
+                job, key, cached, output = futures[future]
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Rendering '{job.name}' failed: {e}")
+                    _temporary_path(cached, job).unlink(missing_ok=True)
+                    summary.append({"name": job.name, "key": key, "status": "failed", "path": None, "seconds": np.nan})
+                    continue
+                # Publish to the cache only once complete, so a crash never leaves a bad entry.
+                _temporary_path(cached, job).replace(cached)
+                shutil.copyfile(cached, output)
+                logger.info(f"Rendered '{job.name}' in {seconds:.1f} s")
+                summary.append({"name": job.name, "key": key, "status": "rendered", "path": output, "seconds": seconds})
+
+    with open(output_dir / "figures.json", "w") as f:
+        json.dump({row["name"]: row["key"] for row in summary if row["status"] != "failed"}, f, indent=2)
+
+    order = {name: i for i, name in enumerate(names)}
+    summary = pd.DataFrame(summary, columns=["name", "key", "status", "path", "seconds"])
+    return summary.sort_values("name", key=lambda s: s.map(order)).reset_index(drop=True)
@@ -0,0 +1,420 @@
+import gzip
+import json
+import sqlite3
+from pathlib import Path
+
+import geopandas as gpd
+import mapbox_vector_tile
+import numpy as np
+import pandas as pd
+import shapely
+
+from template.quadkey_utils import quadkeys_to_tiles
+from weighted_aggregation import coarsen_quadkeys
+
+# --- Logger for consistent output ---
+class SimpleLogger:
+    def info(self, message):
+        print(f"INFO: {message}")
+    def error(self, message):
+        print(f"ERROR: {message}")
+
+logger = SimpleLogger()
+
+# Half the width of the Web Mercator (EPSG:3857) world, in metres.
+MERCATOR_HALF_WORLD = 20037508.342789244
+
+TILE_EXTENT = 4096
+
+# Clipping buffer around each tile, in tile units, so polygon edges do not show seams.
+TILE_BUFFER = 64
+
+# Quadkey levels kept below each tile: a tile holds at most 4 ** QUADKEY_DETAIL squares.
+QUADKEY_DETAIL = 5
+
+# --- Tile Assignment Functions ---
+
+def _tile_size(zoom: int) -> float:
+    return 2 * MERCATOR_HALF_WORLD / 2 ** zoom
+
+
+def _tile_bounds(x: int, y: int, zoom: int) -> tuple[float, float, float, float]:
+    """Returns the EPSG:3857 bounds (minx, miny, maxx, maxy) of a tile."""
+    size = _tile_size(zoom)
+    minx = -MERCATOR_HALF_WORLD + x * size
+    maxy = MERCATOR_HALF_WORLD - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def _tile_ranges(gdf_mercator: gpd.GeoDataFrame, zoom: int, quadkey_tiles: tuple | None):
+    """
+    Returns the inclusive tile ranges (xmin, xmax, ymin, ymax) covered by each feature.
+
+    For quadkey layers the range comes straight from the key: a parent tile is
+    a bit shift of the key's x/y, and a finer zoom covers a block of children.
+    Other layers (e.g. H3) fall back to the feature's bounding box.
+    """
+    if quadkey_tiles is not None:
+        x, y, quadkey_zoom = quadkey_tiles
+        if zoom <= quadkey_zoom:
+            shift = quadkey_zoom - zoom
+            return x >> shift, x >> shift, y >> shift, y >> shift
+        shift = zoom - quadkey_zoom
+        return x << shift, ((x + 1) << shift) - 1, y << shift, ((y + 1) << shift) - 1
+
+    size = _tile_size(zoom)
+    n = 2 ** zoom
+    bounds = gdf_mercator.geometry.bounds.to_numpy()
+    xmin = np.floor((bounds[:, 0] + MERCATOR_HALF_WORLD) / size)
+    xmax = np.floor((bounds[:, 2] + MERCATOR_HALF_WORLD) / size)
+    ymin = np.floor((MERCATOR_HALF_WORLD - bounds[:, 3]) / size)
+    ymax = np.floor((MERCATOR_HALF_WORLD - bounds[:, 1]) / size)
+    return tuple(np.clip(v, 0, n - 1).astype("int64") for v in (xmin, xmax, ymin, ymax))
+
+
+def _assign_tiles(xmin, xmax, ymin, ymax):
+    """Expands per-feature tile ranges into (feature, x, y) triples, sorted by tile."""
+    widths = xmax - xmin + 1
+    counts = widths * (ymax - ymin + 1)
+    feature = np.repeat(np.arange(len(counts)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    x = xmin[feature] + offset % widths[feature]
+    y = ymin[feature] + offset // widths[feature]
+    order = np.lexsort((feature, y, x))
+    return feature[order], x[order], y[order]
+
+
+def _aggregate_quadkeys(
+    gdf_mercator: gpd.GeoDataFrame,
+    quadkey_column: str,
+    quadkey_tiles: tuple,
+    level: int,
+    attributes: list[str],
+    aggregations: dict,
+):
+    """
+    Merges quadkey features into one square per parent quadkey at a coarser level.
+
+    The parent's key replaces `quadkey_column`, attributes are combined with
+    `aggregations` (numeric ones not listed are averaged), and other attributes are
+    left out. Returns the merged layer and its (x, y, level) tiles.
+    """
+    x, y, quadkey_zoom = quadkey_tiles
+    shift = quadkey_zoom - level
+    codes, parents = pd.factorize(coarsen_quadkeys(gdf_mercator[quadkey_column].to_numpy(), level, quadkey_zoom))
+    first = np.unique(codes, return_index=True)[1]
+    parent_x, parent_y = x[first] >> shift, y[first] >> shift
+
+    columns = [
+        c for c in attributes
+        if c != quadkey_column and (c in aggregations or pd.api.types.is_numeric_dtype(gdf_mercator[c].dtype))
+    ]
+    if columns:
+        merged = gdf_mercator[columns].groupby(codes, sort=True).agg({c: aggregations.get(c, "mean") for c in columns})
+        merged = merged.reset_index(drop=True)
+    else:
+        merged = pd.DataFrame(index=range(len(parents)))
+    merged.insert(0, quadkey_column, parents)
+
+    geometry = shapely.box(*_tile_bounds(parent_x, parent_y, level))
+    return gpd.GeoDataFrame(merged, geometry=geometry, crs=gdf_mercator.crs), (parent_x, parent_y, level)
+
+
+def _feature_ids(values) -> np.ndarray:
+    """Derives stable MVT feature ids from key values, so ids survive partial rewrites."""
+    return pd.util.hash_array(np.asarray(values))
+
+# --- MBTiles Functions ---
+
+def _open_mbtiles(output_path: Path):
+    conn = sqlite3.connect(output_path)
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS tiles (
+            zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB,
+            PRIMARY KEY (zoom_level, tile_column, tile_row)
+        );
+        """
+    )
+    return conn
+
+
+def _field_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return "Boolean"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "Number"
+    return "String"
+
+
+def _properties(df: pd.DataFrame) -> list[dict]:
+    """Converts attribute rows to MVT properties, dropping missing values."""
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    return [
+        {k: (v.isoformat() if hasattr(v, "isoformat") else v) for k, v in record.items() if v is not None}
+        for record in records
+    ]
+
+
+def export_vector_tiles(
+    gdf: gpd.GeoDataFrame,
+    output_path: str | Path,
+    layer_name: str,
+    min_zoom: int = 0,
+    max_zoom: int | None = None,
+    attributes: list[str] | None = None,
+    attribute_min_zoom: dict | None = None,
+    quadkey_column: str | None = None,
+    quadkey_zoom: int | None = None,
+    quadkey_detail: int = QUADKEY_DETAIL,
+    aggregations: dict | None = None,
+    id_column: str | None = None,
+    simplify_pixels: float = 1.0,
+    min_area_pixels: float = 0.0,
+    tiles: set | None = None,
+) -> Path:
+    """
+    Writes a GeoDataFrame as Mapbox Vector Tiles in an MBTiles archive.
+
+    Each zoom level is generalized once, before tiling. Quadkey layers are merged
+    into parent quadkeys `quadkey_detail` levels below the zoom, so a low-zoom tile
+    holds at most 4 ** `quadkey_detail` squares instead of every feature. Other
+    geometries are simplified to `simplify_pixels` tile pixels and features smaller
+    than `min_area_pixels` are dropped. Features are assigned to tiles from their
+    quadkey when `quadkey_column` is given, otherwise from their bounding box, and
+    clipped to each tile.
+
+    Passing `tiles` only rewrites those (z, x, y) tiles of an existing archive,
+    e.g. the output of `changed_tiles` after a quarterly update. Use `to_pmtiles`
+    to convert the archive for static hosting.
+
+    Args:
+        gdf (gpd.GeoDataFrame): Layer to export, e.g. `conflict_national_h3_4` or
+            a `gdf_{iso}_with_variables` grid. Must have a CRS.
+        output_path (str | Path): Path of the `.mbtiles` file.
+        layer_name (str): Name of the vector layer inside each tile.
+        min_zoom (int): Lowest zoom level written.
+        max_zoom (int | None): Highest zoom level written. Defaults to `quadkey_zoom`
+            for quadkey layers and 10 otherwise.
+        attributes (list[str] | None): Columns written as feature properties.
+            Defaults to every non-geometry column.
+        attribute_min_zoom (dict | None): Lowest zoom at which a column is included,
+            e.g. {'nrFatalities': 8}. Columns not listed appear at every zoom.
+        quadkey_column (str | None): Column holding the quadkey of each feature.
+        quadkey_zoom (int | None): Zoom of the quadkeys. Required for integer keys.
+        quadkey_detail (int): Quadkey levels kept within each tile at zooms below
+            `quadkey_zoom`.
+        aggregations (dict | None): How attributes of merged quadkeys are combined,
+            e.g. {'nrFatalities': 'sum', 'nrEvents': 'sum'}. Numeric attributes not
+            listed are averaged; other attributes are left out of merged squares.
+        id_column (str | None): Column whose values give stable feature ids, e.g.
+            'h3_index'. Defaults to `quadkey_column`; features have no id if neither
+            is given. Merged squares take their ids from the parent quadkey.
+        simplify_pixels (float): Simplification tolerance, in tile pixels.
+        min_area_pixels (float): Minimum feature area, in square tile pixels.
+        tiles (set | None): (z, x, y) tiles to rewrite. All tiles if None.
+
+    Returns:
+        Path: Path of the written archive.
+    """
+    if gdf.crs is None:
+        raise ValueError("The input GeoDataFrame must have a defined Coordinate Reference System (CRS).")
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    gdf_mercator = gdf.to_crs(epsg=3857).reset_index(drop=True)
+
+    quadkey_tiles = None
+    if quadkey_column is not None:
+        quadkey_tiles = quadkeys_to_tiles(gdf_mercator[quadkey_column].to_numpy(), quadkey_zoom)
+        quadkey_zoom = quadkey_tiles[2]
+    if max_zoom is None:
+        max_zoom = quadkey_zoom if quadkey_zoom is not None else 10
+
+    if attributes is None:
+        attributes = [c for c in gdf_mercator.columns if c != gdf_mercator.geometry.name]
+    attribute_min_zoom = attribute_min_zoom or {}
+    aggregations = aggregations or {}
+    id_column = id_column or quadkey_column
+
+    conn = _open_mbtiles(output_path)
+    if tiles is None:
+        conn.execute("DELETE FROM tiles")
+    nr_tiles = 0
+
+    for zoom in range(min_zoom, max_zoom + 1):
+        zoom_tiles = None if tiles is None else {(x, y) for z, x, y in tiles if z == zoom}
+        if zoom_tiles is not None and not zoom_tiles:
+            continue
+
+        # Generalize once per zoom level.
+        layer, layer_tiles, layer_ids = gdf_mercator, quadkey_tiles, id_column
+        if quadkey_tiles is not None and zoom + quadkey_detail < quadkey_zoom:
+            layer, layer_tiles = _aggregate_quadkeys(
+                gdf_mercator, quadkey_column, quadkey_tiles, zoom + quadkey_detail, attributes, aggregations
+            )
+            layer_ids = quadkey_column
+
+        pixel = _tile_size(zoom) / TILE_EXTENT
+        geometry = shapely.simplify(layer.geometry.values, simplify_pixels * pixel, preserve_topology=True)
+        keep = ~shapely.is_empty(geometry)
+        if min_area_pixels > 0:
+            keep &= shapely.area(geometry) >= min_area_pixels * pixel ** 2
+        keep = np.flatnonzero(keep)
+
+        columns = [c for c in attributes if attribute_min_zoom.get(c, 0) <= zoom and c in layer.columns]
+        properties = _properties(layer.loc[keep, columns])
+        ids = _feature_ids(layer[layer_ids].to_numpy()[keep]) if layer_ids is not None else None
+
+        ranges = _tile_ranges(
+            layer.iloc[keep],
+            zoom,
+            None if layer_tiles is None else (layer_tiles[0][keep], layer_tiles[1][keep], layer_tiles[2]),
+        )
+        feature, tile_x, tile_y = _assign_tiles(*ranges)
+
+        # Remove the tiles being rewritten, including ones that are now empty.
+        rows = [(zoom, x, 2 ** zoom - 1 - y) for x, y in (zoom_tiles or [])]
+        conn.executemany("DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", rows)
+
+        tile_key = tile_x * 2 ** zoom + tile_y
+        starts = np.flatnonzero(np.r_[True, tile_key[1:] != tile_key[:-1]])
+        for start, end in zip(starts, np.r_[starts[1:], len(tile_key)]):
+            x, y = int(tile_x[start]), int(tile_y[start])
+            if zoom_tiles is not None and (x, y) not in zoom_tiles:
+                continue
+
+            minx, miny, maxx, maxy = _tile_bounds(x, y, zoom)
+            buffer = TILE_BUFFER * pixel
+            clipped = shapely.clip_by_rect(
+                geometry[keep[feature[start:end]]], minx - buffer, miny - buffer, maxx + buffer, maxy + buffer
+            )
+            features = [
+                {"geometry": geom, "properties": properties[i], **({"id": int(ids[i])} if ids is not None else {})}
+                for geom, i in zip(clipped, feature[start:end])
+                if not geom.is_empty
+            ]
+            if not features:
+                continue
+
+            data = mapbox_vector_tile.encode(
+                [{"name": layer_name, "features": features}],
+                default_options={"quantize_bounds": (minx, miny, maxx, maxy), "extents": TILE_EXTENT},
+            )
+            # MBTiles uses TMS row numbering, with y pointing north.
+            conn.execute(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+                (zoom, x, 2 ** zoom - 1 - y, gzip.compress(data)),
+            )
+            nr_tiles += 1
+
+    west, south, east, north = gdf.to_crs(epsg=4326).total_bounds
+    vector_layers = [{
+        "id": layer_name,
+        "minzoom": min_zoom,
+        "maxzoom": max_zoom,
+        "fields": {c: _field_type(gdf_mercator[c].dtype) for c in attributes},
+    }]
+    metadata = {
+        "name": layer_name,
+        "format": "pbf",
+        "type": "overlay",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": f"{west},{south},{east},{north}",
+        "center": f"{(west + east) / 2},{(south + north) / 2},{min_zoom}",
+        "json": json.dumps({"vector_layers": vector_layers}),
+    }
+    conn.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?)", metadata.items())
+    conn.commit()
+    conn.close()
+
+    logger.info(f"{nr_tiles} tiles of layer '{layer_name}' written to: {output_path}")
+    return output_path
+
+
+def changed_tiles(
+    previous: gpd.GeoDataFrame,
+    current: gpd.GeoDataFrame,
+    key_column: str,
+    min_zoom: int,
+    max_zoom: int,
+    attributes: list[str] | None = None,
+    quadkey_zoom: int | None = None,
+    quadkey_column: str | None = None,
+) -> set:
+    """
+    Lists the tiles whose content differs between two versions of a layer.
+
+    Features are matched on `key_column`; a feature counts as changed if it was
+    added, removed, or any of its attributes or its geometry differ. The tiles
+    touched by a changed feature, in either version, are returned.
+
+    Args:
+        previous (gpd.GeoDataFrame): Layer as last exported.
+        current (gpd.GeoDataFrame): Updated layer.
+        key_column (str): Column identifying a feature, e.g. 'index' or 'h3_index'.
+        min_zoom (int): Lowest zoom level of the archive.
+        max_zoom (int): Highest zoom level of the archive.
+        attributes (list[str] | None): Columns compared. Defaults to all shared columns.
+        quadkey_zoom (int | None): Zoom of the quadkeys, for integer keys.
+        quadkey_column (str | None): Quadkey column, to assign tiles from the key.
+
+    Returns:
+        set: (z, x, y) tiles to pass to `export_vector_tiles(tiles=...)`.
+    """
+    if attributes is None:
+        attributes = [c for c in current.columns if c in previous.columns and c != current.geometry.name]
+
+    def _hashes(gdf):
+        values = gdf[attributes].copy()
+        values["_geometry"] = shapely.to_wkb(gdf.geometry.values)
+        return pd.Series(pd.util.hash_pandas_object(values, index=False).to_numpy(), index=gdf[key_column].to_numpy())
+
+    old, new = _hashes(previous), _hashes(current)
+    old, new = old[~old.index.duplicated()], new[~new.index.duplicated()]
+    aligned = pd.concat([old.rename("old"), new.rename("new")], axis=1)
+    keys = aligned.index[aligned["old"] != aligned["new"]]
+
+    tiles = set()
+    for gdf in (previous, current):
+        subset = gdf[gdf[key_column].isin(keys)]
+        if subset.empty:
+            continue
+        subset_mercator = subset.to_crs(epsg=3857)
+        quadkey_tiles = None
+        if quadkey_column is not None:
+            quadkey_tiles = quadkeys_to_tiles(subset_mercator[quadkey_column].to_numpy(), quadkey_zoom)
+        for zoom in range(min_zoom, max_zoom + 1):
+            _, x, y = _assign_tiles(*_tile_ranges(subset_mercator, zoom, quadkey_tiles))
+            tiles.update((zoom, int(a), int(b)) for a, b in zip(x, y))
+    return tiles
+
+
+def to_pmtiles(mbtiles_path: str | Path, pmtiles_path: str | Path | None = None) -> Path:
+    """
+    Converts an MBTiles archive to a single-file PMTiles archive.
+
+    PMTiles can be served from static storage; viewers fetch only the byte ranges
+    of the visible tiles. Requires the `pmtiles` package.
+
+    Args:
+        mbtiles_path (str | Path): Archive written by `export_vector_tiles`.
+        pmtiles_path (str | Path | None): Output path. Defaults to the same name
+            with a `.pmtiles` suffix.
+
+    Returns:
+        Path: Path of the PMTiles archive.
+    """
+    from pmtiles.convert import mbtiles_to_pmtiles
+
+    mbtiles_path = Path(mbtiles_path)
+    pmtiles_path = Path(pmtiles_path) if pmtiles_path is not None else mbtiles_path.with_suffix(".pmtiles")
+
+    with sqlite3.connect(mbtiles_path) as conn:
+        max_zoom = int(conn.execute("SELECT value FROM metadata WHERE name = 'maxzoom'").fetchone()[0])
+    mbtiles_to_pmtiles(str(mbtiles_path), str(pmtiles_path), max_zoom)
+
+    logger.info(f"PMTiles archive saved to: {pmtiles_path}")
+    return pmtiles_path
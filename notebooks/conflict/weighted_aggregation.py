@@ -0,0 +1,309 @@
+import numpy as np
+import pandas as pd
+
+# Weight name meaning one unit per row, i.e. an unweighted mean.
+COUNT = "count"
+
+# Column levels of the output of `weighted_sums`.
+SUM_LEVELS = ["column", "statistic", "weight", "part"]
+
+# --- Target Level Functions ---
+
+def coarsen_quadkeys(quadkeys, target_zoom: int, zoom: int | None = None):
+    """
+    Returns the parent quadkey of each quadkey at a coarser zoom level.
+
+    Args:
+        quadkeys (array-like): String quadkeys, or integer quadkeys as in the `index`
+            column after `astype('int')` (leading zeros dropped).
+        target_zoom (int): Zoom level of the parents.
+        zoom (int | None): Zoom level of `quadkeys`. Required for integer quadkeys.
+
+    Returns:
+        np.ndarray: Parent quadkeys, of the same kind (string or integer) as `quadkeys`.
+    """
+    quadkeys = np.asarray(quadkeys)
+    if np.issubdtype(quadkeys.dtype, np.integer):
+        if zoom is None:
+            raise ValueError("zoom must be given for integer quadkeys.")
+        if target_zoom > zoom:
+            raise ValueError("target_zoom must not exceed zoom.")
+        # The parent's digits are a prefix of the child's.
+        return quadkeys // 10 ** (zoom - target_zoom)
+    return quadkeys.astype("str").astype(f"U{target_zoom}")
+
+
+def coarsen_h3(cells, resolution: int) -> np.ndarray:
+    """
+    Returns the parent H3 cell of each cell at a coarser resolution.
+
+    Each distinct cell is looked up once. Requires the `h3` package (v4).
+
+    Args:
+        cells (array-like): H3 cells as strings or integers, e.g. `h3_index`.
+        resolution (int): Resolution of the parents.
+
+    Returns:
+        np.ndarray: Parent cells, of the same kind (string or integer) as `cells`.
+    """
+    import h3
+
+    codes, uniques = pd.factorize(pd.Series(cells), sort=False)
+    if len(uniques) and not isinstance(uniques[0], str):
+        parents = np.array([h3.str_to_int(h3.cell_to_parent(h3.int_to_str(int(c)), resolution)) for c in uniques],
+                           dtype="uint64")
+    else:
+        parents = np.array([h3.cell_to_parent(c, resolution) for c in uniques], dtype=object)
+    return parents[codes]
+
+# --- Aggregation Functions ---
+
+def _group_codes(data: pd.DataFrame, by: list[str]):
+    """Returns each row's group code (-1 for a missing key) and the group keys, sorted."""
+    grouper = data.groupby(by, sort=True)
+    codes = grouper.ngroup()
+    codes = codes.where(codes.notna(), -1).to_numpy(dtype="int64")
+    return codes, grouper.size().index
+
+
+def _weights(data: pd.DataFrame, weights: list[str]) -> dict[str, np.ndarray]:
+    result = {}
+    for weight in weights:
+        if weight == COUNT and weight not in data.columns:
+            result[weight] = np.ones(len(data))
+            continue
+        values = pd.to_numeric(data[weight], errors="coerce").to_numpy(dtype="float64")
+        if (values < 0).any():
+            raise ValueError(f"Weights must not be negative: '{weight}'.")
+        result[weight] = values
+    return result
+
+
+def weighted_sums(
+    data: pd.DataFrame,
+    columns: str | list[str],
+    by: str | list[str],
+    weights: str | list[str] = ("population", "tests"),
+    shares: dict[str, float] | None = None,
+    totals: str | list[str] = (),
+) -> pd.DataFrame:
+    """
+    Computes additive (sum, weight) pairs of metrics per group, in a single pass.
+
+    For every metric and weight, the 'sum' part is the sum of weight x value and
+    the 'weight' part the sum of weight, over rows where both are known. Because
+    every output column is a plain sum, the result of a fine level (e.g. quadkey 14)
+    can be re-aggregated to any coarser level with `reaggregate_sums`, or updated
+    with new rows, and still give exact weighted means.
+
+    The columns are a MultiIndex of ('column', 'statistic', 'weight', 'part'), so
+    the pairs never have to be recovered from column names:
+
+    - (metric, 'mean', weight, 'sum' | 'weight') for each metric and weight.
+    - (metric, 'share', weight, 'sum' | 'weight') for each share.
+    - (weight, 'total', weight, 'sum') for the total of each weight.
+    - (column, 'total', '', 'sum') for each plain total.
+
+    Args:
+        data (pd.DataFrame): One row per cell and period, e.g. the melted `internet` frame.
+        columns (str | list[str]): Metrics to average, e.g. 'download_speed'.
+        by (str | list[str]): Target level, e.g. ['country', 'date'], an admin column,
+            or a coarser cell column from `coarsen_quadkeys` or `coarsen_h3`.
+        weights (str | list[str]): Weight columns, e.g. 'population' (WorldPop) and
+            'tests' (Ookla). 'count' gives unit weights, i.e. an unweighted mean.
+        shares (dict[str, float] | None): Metrics mapped to a threshold. The weighted
+            share of rows whose value exceeds it is carried as a 'share' pair,
+            e.g. {'nrEvents': 0} for the population share of cells with conflict events.
+        totals (str | list[str]): Columns to sum as they are, e.g. 'nrFatalities'.
+
+    Returns:
+        pd.DataFrame: One row per group, indexed by `by`, with the columns above.
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    by = [by] if isinstance(by, str) else list(by)
+    weights = [weights] if isinstance(weights, str) else list(weights)
+    totals = [totals] if isinstance(totals, str) else list(totals)
+
+    codes, groups = _group_codes(data, by)
+    known = codes >= 0
+    codes = codes[known]
+    n_groups = len(groups)
+
+    def group_sum(values):
+        return np.bincount(codes, weights=values[known], minlength=n_groups)
+
+    metrics = {(c, "mean"): pd.to_numeric(data[c], errors="coerce").to_numpy(dtype="float64") for c in columns}
+    for column, threshold in (shares or {}).items():
+        values = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype="float64")
+        metrics[(column, "share")] = np.where(np.isnan(values), np.nan, values > threshold)
+
+    result = {}
+    weight_values = _weights(data, weights)
+    for weight, w in weight_values.items():
+        result[(weight, "total", weight, "sum")] = group_sum(np.nan_to_num(w))
+    for (name, statistic), values in metrics.items():
+        for weight, w in weight_values.items():
+            valid = np.isfinite(values) & np.isfinite(w)
+            result[(name, statistic, weight, "sum")] = group_sum(np.where(valid, values * w, 0.0))
+            result[(name, statistic, weight, "weight")] = group_sum(np.where(valid, w, 0.0))
+    for column in totals:
+        values = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype="float64")
+        result[(column, "total", "", "sum")] = group_sum(np.nan_to_num(values))
+
+    sums = pd.DataFrame(result, index=groups)
+    sums.columns = pd.MultiIndex.from_tuples(sums.columns, names=SUM_LEVELS)
+    return sums
+
+
+def reaggregate_sums(sums: pd.DataFrame, by: str | list[str]) -> pd.DataFrame:
+    """
+    Re-aggregates the output of `weighted_sums` to a coarser level, or combines batches.
+
+    Args:
+        sums (pd.DataFrame): Output of `weighted_sums`, or several concatenated.
+        by (str | list[str]): Index levels of the coarser level, e.g. 'country' from
+            ['country', 'index']. To coarsen cells, compute the weighted sums with the
+            coarser cell as an extra `by` column and drop it here.
+
+    Returns:
+        pd.DataFrame: Sums per group, in the same layout as `weighted_sums`.
+    """
+    return sums.groupby(level=by, sort=True).sum()
+
+
+def weighted_means(sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turns (sum, weight) pairs into weighted means and shares.
+
+    Args:
+        sums (pd.DataFrame): Output of `weighted_sums` or `reaggregate_sums`.
+
+    Returns:
+        pd.DataFrame: '{column}_mean_{weight}' for each metric and '{column}_share_{weight}'
+            for each share, next to the weight totals and plain totals. Groups without
+            any weight get NaN.
+    """
+    if list(sums.columns.names) != SUM_LEVELS:
+        raise ValueError("Expected the output of weighted_sums or reaggregate_sums.")
+
+    result = {}
+    for column, statistic, weight, part in sums.columns:
+        if statistic == "total":
+            result[column] = sums[(column, statistic, weight, part)]
+        elif part == "sum":
+            total = sums[(column, statistic, weight, "weight")]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums[(column, statistic, weight, "sum")] / total
+            result[f"{column}_{statistic}_{weight}"] = mean.where(total > 0)
+    return pd.DataFrame(result, index=sums.index)
+
+
+def weighted_quantiles(
+    data: pd.DataFrame,
+    column: str,
+    by: str | list[str],
+    weights: str | list[str] = "population",
+    q=(0.25, 0.5, 0.75),
+) -> pd.DataFrame:
+    """
+    Computes weighted quantiles of a metric per group with a single sort.
+
+    The quantile q of a group is the smallest value whose cumulative weight reaches
+    q x the group's total weight (the 'inverted_cdf' method of `np.quantile`).
+    The rows are sorted once, by group and value, for all weights and quantiles.
+    Unlike means, quantiles cannot be re-aggregated from sums; compute them from
+    the rows at each target level.
+
+    Args:
+        data (pd.DataFrame): Rows with `column`, `weights` and `by`.
+        column (str): Metric, e.g. 'download_speed'.
+        by (str | list[str]): Target level.
+        weights (str | list[str]): Weight columns, or 'count' for unweighted quantiles.
+        q (float | array-like): Quantiles in [0, 1].
+
+    Returns:
+        pd.DataFrame: '{column}_q{100q}_{weight}' per quantile and weight, indexed by `by`.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    weights = [weights] if isinstance(weights, str) else list(weights)
+    q = np.atleast_1d(np.asarray(q, dtype="float64"))
+    if ((q < 0) | (q > 1)).any():
+        raise ValueError("Quantiles must be between 0 and 1.")
+
+    codes, groups = _group_codes(data, by)
+    values = pd.to_numeric(data[column], errors="coerce").to_numpy(dtype="float64")
+    valid = (codes >= 0) & np.isfinite(values)
+
+    # Sort by group, then value; cumulative weights then increase through every group.
+    order = np.flatnonzero(valid)[np.lexsort((values[valid], codes[valid]))]
+    codes, values = codes[order], values[order]
+
+    n_groups = len(groups)
+    starts = np.searchsorted(codes, np.arange(n_groups), side="left")
+    ends = np.searchsorted(codes, np.arange(n_groups), side="right")
+    last = np.maximum(ends - 1, starts)
+
+    result = {}
+    for weight, w in _weights(data, weights).items():
+        cumulative = np.cumsum(np.nan_to_num(w[order]))
+        if not len(cumulative):
+            cumulative = np.zeros(1)
+        base = np.where(starts > 0, cumulative[np.maximum(starts - 1, 0)], 0.0)
+        total = np.where(ends > starts, cumulative[np.maximum(ends - 1, 0)], 0.0) - base
+
+        for quantile in q:
+            if quantile > 0:
+                position = np.searchsorted(cumulative, base + quantile * total, side="left")
+            else:
+                # Skip leading rows without weight.
+                position = np.searchsorted(cumulative, base, side="right")
+            position = np.minimum(np.clip(position, starts, last), max(len(values) - 1, 0))
+            picked = values[position] if len(values) else np.zeros(n_groups)
+            result[f"{column}_q{quantile * 100:g}_{weight}"] = np.where(total > 0, picked, np.nan)
+    return pd.DataFrame(result, index=groups)
+
+
+def aggregate_weighted(
+    data: pd.DataFrame,
+    columns: str | list[str],
+    by: str | list[str],
+    weights: str | list[str] = ("population", "tests"),
+    q=(0.25, 0.5, 0.75),
+    shares: dict[str, float] | None = None,
+    totals: str | list[str] = (),
+) -> pd.DataFrame:
+    """
+    Aggregates metrics to a target level with weighted means, shares and quantiles.
+
+    For example, population-weighted national download speeds next to the summed
+    conflict counts:
+
+        national = aggregate_weighted(merged, 'download_speed', ['country', 'date'],
+                                      weights='population', totals=['nrFatalities', 'nrEvents'])
+
+    To re-aggregate later or incrementally, keep `weighted_sums` instead and apply
+    `reaggregate_sums` and `weighted_means`.
+
+    Args:
+        data (pd.DataFrame): One row per cell and period.
+        columns (str | list[str]): Metrics to average.
+        by (str | list[str]): Target level.
+        weights (str | list[str]): Weight columns, or 'count' for unit weights.
+        q (float | array-like): Weighted quantiles to compute for each metric and weight.
+            Empty for none.
+        shares (dict[str, float] | None): See `weighted_sums`.
+        totals (str | list[str]): Columns to sum as they are.
+
+    Returns:
+        pd.DataFrame: One row per group, with `by` as columns, the weight totals,
+            '{column}_mean_{weight}', '{column}_share_{weight}',
+            '{column}_q{100q}_{weight}' and the plain totals.
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    weights = [weights] if isinstance(weights, str) else list(weights)
+
+    result = weighted_means(weighted_sums(data, columns, by, weights, shares, totals))
+    if len(np.atleast_1d(q)):
+        quantiles = [weighted_quantiles(data, c, by, weights, q) for c in columns]
+        result = result.join(quantiles)
+    return result.reset_index()
@@ -0,0 +1,254 @@
+import glob
+import hashlib
+import inspect
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+# --- Logger for consistent output ---
+class SimpleLogger:
+    def info(self, message):
+        print(f"INFO: {message}")
+    def error(self, message):
+        print(f"ERROR: {message}")
+
+logger = SimpleLogger()
+
+# Bump to invalidate every Parquet sidecar, e.g. after changing the parsing below.
+CACHE_VERSION = 1
+
+LHR_SHEET = "2A - LHR by Ctry"
+
+COUNTRY_NAMES = {
+    "Turkey": "Turkiye",
+    "Türkiye": "Turkiye",
+}
+
+# --- Workbook Functions ---
+
+def workbook_digest(excel_file: str | Path, chunk_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of a workbook's bytes."""
+    hasher = hashlib.sha256()
+    with open(excel_file, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _column_names(values) -> list:
+    """Names header cells the way `pd.read_excel` does: 'Unnamed: i' for blanks, '.n' for duplicates."""
+    names, seen = [], {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None or (isinstance(value, str) and not value) else value
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _read_worksheet(worksheet, header: int) -> pd.DataFrame:
+    """
+    Streams one read-only worksheet into a DataFrame of raw cell values.
+
+    Matches `pd.read_excel(..., header=header)`: rows above `header` are skipped,
+    trailing empty rows and columns are dropped, and cell types are left as openpyxl
+    returns them (e.g. datetime for date cells).
+    """
+    worksheet.reset_dimensions()
+    rows = [row for row in worksheet.iter_rows(values_only=True)]
+
+    # Trim trailing empty rows and columns, which read-only sheets often report.
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    width = max((max((i + 1 for i, v in enumerate(row) if v is not None), default=0) for row in rows), default=0)
+
+    if len(rows) <= header:
+        return pd.DataFrame()
+    names = _column_names((list(rows[header]) + [None] * width)[:width])
+    body = [(list(row) + [None] * width)[:width] for row in rows[header + 1:]]
+    return pd.DataFrame(body, columns=names, dtype=object)
+
+
+def _sheet_slug(sheet_name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in sheet_name).strip("_")
+
+
+def _cleaner_id(header: int, clean: Callable | None) -> str:
+    """Identifies a cleaning function by name, so its sidecars can be told apart from other cleaners'."""
+    name = f"{clean.__module__}.{clean.__qualname__}" if clean is not None else "raw"
+    return hashlib.sha256(f"{name}|{header}".encode()).hexdigest()[:8]
+
+
+def _sidecar_prefix(excel_file: Path, sheet_name: str, header: int, clean: Callable | None) -> str:
+    return f"{excel_file.stem}.{_sheet_slug(sheet_name)}.{_cleaner_id(header, clean)}"
+
+
+def _sidecar_path(prefix: str, key: str, cache_dir: Path) -> Path:
+    return cache_dir / f"{prefix}.{key[:16]}.parquet"
+
+
+def _sheet_key(digest: str, sheet_name: str, header: int, clean: Callable | None) -> str:
+    """Keys a sidecar on the workbook content, the sheet, and the cleaning function's source."""
+    hasher = hashlib.sha256()
+    hasher.update(repr((CACHE_VERSION, digest, sheet_name, header)).encode())
+    if clean is not None:
+        hasher.update(f"{clean.__module__}.{clean.__qualname__}".encode())
+        try:
+            hasher.update(inspect.getsource(clean).encode())
+        except (OSError, TypeError):
+            pass
+    return hasher.hexdigest()
+
+
+def load_sheets(
+    excel_file: str | Path,
+    sheets: dict[str, Callable | None],
+    header: int = 3,
+    cache_dir: str | Path | None = None,
+    force: bool = False,
+) -> dict[str, pd.DataFrame]:
+    """
+    Loads cleaned sheets of a workbook, parsing the workbook only on a cache miss.
+
+    Each cleaned sheet is stored as a typed Parquet sidecar keyed by the SHA-256 of
+    the workbook's bytes, so a later load of an unchanged workbook reads Parquet
+    instead of the Excel file. On a miss, the workbook is opened once in
+    read-only (streaming) mode and only the requested sheets are parsed.
+
+    Args:
+        excel_file (str | Path): Path to the .xlsx workbook.
+        sheets (dict[str, Callable | None]): Sheet names mapped to a function turning
+            the raw sheet (as `pd.read_excel(..., header=header)` returns it) into a
+            typed DataFrame, or None to keep the raw sheet.
+        header (int): Row (0-indexed) holding the column names.
+        cache_dir (str | Path | None): Directory of the sidecars. Defaults to the
+            workbook's directory.
+        force (bool): Re-parse the workbook even if its sidecars exist.
+
+    Returns:
+        dict[str, pd.DataFrame]: Cleaned DataFrame per sheet name.
+    """
+    excel_file = Path(excel_file)
+    cache_dir = Path(cache_dir) if cache_dir is not None else excel_file.parent
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = workbook_digest(excel_file)
+    prefixes = {name: _sidecar_prefix(excel_file, name, header, clean) for name, clean in sheets.items()}
+    paths = {
+        name: _sidecar_path(prefixes[name], _sheet_key(digest, name, header, clean), cache_dir)
+        for name, clean in sheets.items()
+    }
+
+    result = {}
+    missing = []
+    for name in sheets:
+        if paths[name].exists() and not force:
+            result[name] = pd.read_parquet(paths[name])
+        else:
+            missing.append(name)
+
+    if missing:
+        import openpyxl
+
+        logger.info(f"Parsing {len(missing)} sheet(s) of {excel_file.name}")
+        workbook = openpyxl.load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+        try:
+            for name in missing:
+                data = _read_worksheet(workbook[name], header)
+                clean = sheets[name]
+                result[name] = clean(data) if clean is not None else data
+        finally:
+            workbook.close()
+
+        for name in missing:
+            path = paths[name]
+            # Remove sidecars of earlier versions of the workbook (or of this cleaner); other cleaners keep theirs.
+            pattern = f"{glob.escape(prefixes[name])}.*.parquet"
+            for stale in cache_dir.glob(pattern):
+                stale.unlink(missing_ok=True)
+            temporary = path.with_suffix(".tmp")
+            result[name].to_parquet(temporary, index=False)
+            temporary.replace(path)
+
+    return {name: result[name] for name in sheets}
+
+# --- LinkedIn Functions ---
+
+def _normalise_unique(values: pd.Series, function: Callable) -> pd.Series:
+    """Applies `function` to the distinct values of a column only, then maps them back."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    normalised = pd.Series(function(pd.Series(uniques, dtype=object)))
+    result = normalised.take(np.maximum(codes, 0)).set_axis(values.index)
+    return result.where(codes >= 0)
+
+
+def clean_lhr_by_country(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans the raw '2A - LHR by Ctry' sheet into typed columns.
+
+    Follows the notebook's `clean_linkedin_data`: rows missing a month, country or
+    rate are dropped, as is the first remaining row (the sheet's own sub-header).
+    'Month' is parsed to the first day of the month, 'Country' is stripped and
+    standardised (e.g. 'Türkiye' to 'Turkiye'), and 'LHR (YOY)' is made numeric.
+    Rows whose month or rate cannot be parsed are dropped and reported.
+    Months and countries are normalised once per distinct value.
+
+    Args:
+        data (pd.DataFrame): Raw sheet read with `header=3`.
+
+    Returns:
+        pd.DataFrame: 'Month' (datetime64), 'Country' (string), 'LHR (YOY)' (float64)
+            and any further columns of the sheet.
+    """
+    data = data.rename(columns={
+        "Unnamed: 1": "Month",
+        "Unnamed: 2": "Country",
+        "Unnamed: 3": "LHR (YOY)",
+    })
+    data = data.dropna(subset=["Month", "Country", "LHR (YOY)"])
+    data = data.iloc[1:]
+    data = data.drop(columns=["Unnamed: 0"], errors="ignore")
+
+    data["Month"] = _normalise_unique(
+        data["Month"],
+        lambda v: pd.to_datetime(v, errors="coerce").dt.to_period("M").dt.to_timestamp(),
+    ).astype("datetime64[ns]")
+    data["Country"] = _normalise_unique(
+        data["Country"],
+        lambda v: v.astype(str).str.strip().replace(COUNTRY_NAMES),
+    ).astype("string")
+    data["LHR (YOY)"] = pd.to_numeric(data["LHR (YOY)"], errors="coerce").astype("float64")
+
+    # Values that could not be parsed are dropped like missing ones, but reported.
+    unparsed = data["Month"].isna() | data["LHR (YOY)"].isna()
+    if unparsed.any():
+        logger.error(f"Dropping {unparsed.sum()} rows whose month or rate could not be parsed.")
+        data = data[~unparsed]
+
+    # Remaining columns are free-form; store them as text so the Parquet schema is stable.
+    for column in data.columns.difference(["Month", "Country", "LHR (YOY)"]):
+        data[column] = data[column].astype("string")
+    data.columns = [str(c) for c in data.columns]
+
+    return data.reset_index(drop=True)
+
+
+def load_linkedin_data(excel_file: str | Path, cache_dir: str | Path | None = None, force: bool = False) -> pd.DataFrame:
+    """
+    Loads the LinkedIn Hiring Rate by country, from its Parquet sidecar when the workbook is unchanged.
+
+    Args:
+        excel_file (str | Path): Path to e.g. 'LinkedIn_LHR by Industry_Feb2025.xlsx'.
+        cache_dir (str | Path | None): Directory of the sidecars. Defaults to the
+            workbook's directory.
+        force (bool): Re-parse the workbook.
+
+    Returns:
+        pd.DataFrame: Output of `clean_lhr_by_country`.
+    """
+    return load_sheets(excel_file, {LHR_SHEET: clean_lhr_by_country}, header=3, cache_dir=cache_dir, force=force)[LHR_SHEET]
@@ -0,0 +1,245 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from rasterio.windows import Window
+
+from template.quadkey_utils import quadkeys_to_tiles
+
+# --- Logger for consistent output ---
+class SimpleLogger:
+    def info(self, message):
+        print(f"INFO: {message}")
+    def error(self, message):
+        print(f"ERROR: {message}")
+
+logger = SimpleLogger()
+
+# Extent covering the 21 MENAP countries (west, south, east, north) in EPSG:4326.
+MENAP_BOUNDS = (-17.5, 10.5, 77.0, 42.0)
+
+PYRAMID_ZOOMS = (12, 13, 14, 15, 16)
+
+METADATA_FILE = "pyramid.json"
+
+# --- Tile Functions ---
+
+def lonlat_to_tile(lon, lat, zoom: int):
+    """
+    Converts longitude/latitude arrays to Web Mercator tile x/y at a zoom level.
+
+    Uses the same formula as `mercantile.tile`, so tiles match the quadkeys
+    produced in `ookla-data-processing.ipynb`.
+
+    Args:
+        lon (array-like): Longitudes in degrees.
+        lat (array-like): Latitudes in degrees.
+        zoom (int): Tile zoom level.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Tile x and y indices as int64 arrays.
+    """
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.clip(np.asarray(lat, dtype="float64"), -85.051129, 85.051129)
+    n = 2 ** zoom
+    lat_rad = np.radians(lat)
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n)
+    x = np.clip(x, 0, n - 1).astype("int64")
+    y = np.clip(y, 0, n - 1).astype("int64")
+    return x, y
+
+# --- Pyramid Functions ---
+
+def _pyramid_extent(bounds: tuple, zoom: int) -> tuple[int, int, int, int]:
+    """Returns the tile offsets (x0, y0) and shape (height, width) of `bounds` at `zoom`."""
+    west, south, east, north = bounds
+    (x0, x1), (y0, y1) = lonlat_to_tile([west, east], [north, south], zoom)
+    return int(x0), int(y0), int(y1 - y0 + 1), int(x1 - x0 + 1)
+
+
+def _accumulate_raster(path_raster: str | Path, grid: np.ndarray, x0: int, y0: int, zoom: int, rows_per_chunk: int):
+    """
+    Adds the population of every valid pixel of a raster to the tile that holds its centre.
+
+    Pixel-centre assignment is what `rasterstats.zonal_stats(..., stats=['sum'])`
+    does by default, so the totals per tile match the existing `population` column.
+    """
+    with rasterio.open(path_raster) as src:
+        if src.crs is not None and src.crs.to_epsg() != 4326:
+            raise ValueError(f"{path_raster} must be in EPSG:4326, found {src.crs}.")
+
+        nodata = src.nodata
+        cols = np.arange(src.width) + 0.5
+        lon = src.transform.c + cols * src.transform.a
+        tile_x, _ = lonlat_to_tile(lon, np.zeros_like(lon), zoom)
+        tile_x = tile_x - x0
+        in_x = (tile_x >= 0) & (tile_x < grid.shape[1])
+
+        for row_start in range(0, src.height, rows_per_chunk):
+            height = min(rows_per_chunk, src.height - row_start)
+            values = src.read(1, window=Window(0, row_start, src.width, height)).astype("float64")
+
+            rows = np.arange(row_start, row_start + height) + 0.5
+            lat = src.transform.f + rows * src.transform.e
+            _, tile_y = lonlat_to_tile(np.zeros_like(lat), lat, zoom)
+            tile_y = tile_y - y0
+            in_y = (tile_y >= 0) & (tile_y < grid.shape[0])
+
+            valid = np.isfinite(values) & (values > 0) & in_y[:, None] & in_x[None, :]
+            if nodata is not None:
+                valid &= values != nodata
+            if not valid.any():
+                continue
+
+            row_idx, col_idx = np.nonzero(valid)
+            np.add.at(grid, (tile_y[row_idx], tile_x[col_idx]), values[row_idx, col_idx])
+
+
+def build_population_pyramid(
+    raster_paths: list[str | Path],
+    output_dir: str | Path = "../../data/population/pyramid",
+    zooms: tuple = PYRAMID_ZOOMS,
+    bounds: tuple = MENAP_BOUNDS,
+    rows_per_chunk: int = 512,
+) -> Path:
+    """
+    Builds a memory-mapped population pyramid from WorldPop rasters.
+
+    The rasters are read once, in row chunks, and every pixel is added to the tile
+    at the finest zoom level. Coarser levels are then derived by summing 2x2 blocks
+    of children, which is exact because quadkey tiles nest. Each level is stored as
+    a dense float32 `.npy` file covering `bounds`, plus a `pyramid.json` holding the
+    tile offsets needed to index it.
+
+    Args:
+        raster_paths (list[str | Path]): WorldPop GeoTIFFs, e.g. one per country
+            (`{iso}_ppp_2020_UNadj_constrained.tif`).
+        output_dir (str | Path): Directory where the pyramid is written.
+        zooms (tuple): Zoom levels to store. The largest one drives the raster pass.
+        bounds (tuple): Extent (west, south, east, north) in EPSG:4326.
+        rows_per_chunk (int): Number of raster rows read at a time.
+
+    Returns:
+        Path: The output directory, ready for `PopulationPyramid.open`.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    zooms = sorted(set(int(z) for z in zooms))
+    max_zoom = zooms[-1]
+
+    # Align the finest grid to the coarsest level so that every 2x2 block has one parent.
+    x0, y0, height, width = _pyramid_extent(bounds, zooms[0])
+    scale = 2 ** (max_zoom - zooms[0])
+    x0, y0, height, width = x0 * scale, y0 * scale, height * scale, width * scale
+
+    grid = np.lib.format.open_memmap(
+        output_dir / f"population_z{max_zoom}.npy", mode="w+", dtype="float32", shape=(height, width)
+    )
+    grid[:] = 0
+
+    for path_raster in raster_paths:
+        logger.info(f"Adding {path_raster} to the z{max_zoom} population grid")
+        _accumulate_raster(path_raster, grid, x0, y0, max_zoom, rows_per_chunk)
+    grid.flush()
+
+    levels = {max_zoom: {"x0": x0, "y0": y0, "height": height, "width": width}}
+    child = grid
+    for zoom in range(max_zoom - 1, zooms[0] - 1, -1):
+        height, width = child.shape[0] // 2, child.shape[1] // 2
+        parent = child.reshape(height, 2, width, 2).sum(axis=(1, 3), dtype="float64").astype("float32")
+        x0, y0 = x0 // 2, y0 // 2
+        if zoom in zooms:
+            np.save(output_dir / f"population_z{zoom}.npy", parent)
+            levels[zoom] = {"x0": x0, "y0": y0, "height": height, "width": width}
+        child = parent
+
+    with open(output_dir / METADATA_FILE, "w") as f:
+        json.dump({"bounds": list(bounds), "levels": {str(z): levels[z] for z in zooms}}, f, indent=2)
+    logger.info(f"Population pyramid saved to: {output_dir}")
+
+    return output_dir
+
+
+class PopulationPyramid:
+    """
+    Read-only access to a population pyramid written by `build_population_pyramid`.
+
+    Levels are opened with `mmap_mode='r'`, so any number of processes can share
+    the same pages and a lookup only touches the tiles it needs.
+    """
+
+    def __init__(self, levels: dict, grids: dict):
+        self.levels = levels
+        self.grids = grids
+
+    @classmethod
+    def open(cls, pyramid_dir: str | Path = "../../data/population/pyramid"):
+        """
+        Opens every level of a pyramid as a read-only memory map.
+
+        Args:
+            pyramid_dir (str | Path): Directory passed to `build_population_pyramid`.
+
+        Returns:
+            PopulationPyramid: The opened pyramid.
+        """
+        pyramid_dir = Path(pyramid_dir)
+        with open(pyramid_dir / METADATA_FILE) as f:
+            metadata = json.load(f)
+
+        levels = {int(z): level for z, level in metadata["levels"].items()}
+        grids = {z: np.load(pyramid_dir / f"population_z{z}.npy", mmap_mode="r") for z in levels}
+        return cls(levels, grids)
+
+    @property
+    def zooms(self) -> list[int]:
+        return sorted(self.levels)
+
+    def lookup_tiles(self, x, y, zoom: int) -> np.ndarray:
+        """
+        Returns the population of tiles given by x/y indices.
+
+        Args:
+            x (array-like): Tile x indices.
+            y (array-like): Tile y indices.
+            zoom (int): Zoom level of the tiles. Must be one of `zooms`.
+
+        Returns:
+            np.ndarray: Population per tile (float32). Tiles outside the extent get 0.
+        """
+        if zoom not in self.levels:
+            raise ValueError(f"Zoom {zoom} is not in the pyramid. Available: {self.zooms}")
+
+        level = self.levels[zoom]
+        row = np.asarray(y, dtype="int64") - level["y0"]
+        col = np.asarray(x, dtype="int64") - level["x0"]
+        inside = (row >= 0) & (row < level["height"]) & (col >= 0) & (col < level["width"])
+
+        population = np.zeros(row.shape, dtype="float32")
+        population[inside] = self.grids[zoom][row[inside], col[inside]]
+        return population
+
+    def lookup(self, quadkeys, zoom: int | None = None) -> np.ndarray:
+        """
+        Returns the population of an array of quadkeys.
+
+        Args:
+            quadkeys (array-like): String or integer quadkeys of a single zoom level,
+                e.g. the `index` column of `MENAP_regional_quadkey12.gpkg`.
+            zoom (int | None): Zoom level. Required for integer quadkeys.
+
+        Returns:
+            np.ndarray: Population per quadkey, aligned with the input.
+        """
+        x, y, zoom = quadkeys_to_tiles(quadkeys, zoom)
+        return self.lookup_tiles(x, y, zoom)
+
+
+if __name__ == "__main__":
+    import glob
+
+    path_data = "../../data/"
+    raster_paths = sorted(glob.glob(path_data + "worldpop/*_ppp_2020_UNadj_constrained.tif"))
+    build_population_pyramid(raster_paths, output_dir=path_data + "population/pyramid")
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+def quadkeys_to_tiles(quadkeys, zoom: int | None = None):
+    """
+    Converts an array of quadkeys to tile x/y indices without a Python loop.
+
+    Quadkeys may be given as strings (e.g. '122130') or as the integers obtained
+    with `astype('int')` in the conflict notebooks. Integer quadkeys lose their
+    leading zeros, so `zoom` is required for them.
+
+    Parameters
+    ----------
+    quadkeys : array-like
+        Quadkeys of a single zoom level.
+    zoom : int, optional
+        Zoom level. Inferred from string length if None.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, int]
+        Tile x, tile y and the zoom level.
+
+    Raises
+    ------
+    ValueError
+        If the quadkeys do not all share the same zoom level, or contain digits
+        other than 0-3.
+    """
+    quadkeys = np.asarray(quadkeys)
+
+    if np.issubdtype(quadkeys.dtype, np.integer):
+        if zoom is None:
+            raise ValueError("zoom must be given for integer quadkeys.")
+        values = quadkeys.astype("int64")
+        digits = np.empty((len(values), zoom), dtype="int64")
+        for i in range(zoom - 1, -1, -1):
+            digits[:, i] = values % 10
+            values = values // 10
+        if (values != 0).any():
+            raise ValueError(f"All quadkeys must have at most {zoom} digits.")
+    else:
+        quadkeys = quadkeys.astype("str")
+        lengths = np.char.str_len(quadkeys)
+        if zoom is None:
+            zoom = int(lengths[0]) if len(quadkeys) else 0
+        if len(quadkeys) and (lengths != zoom).any():
+            raise ValueError(f"All quadkeys must have length {zoom}.")
+        digits = (
+            np.frombuffer(quadkeys.astype(f"S{zoom}").tobytes(), dtype="uint8")
+            .reshape(len(quadkeys), zoom)
+            .astype("int64")
+            - ord("0")
+        )
+
+    if digits.size and ((digits < 0) | (digits > 3)).any():
+        raise ValueError("Quadkeys may only contain the digits 0-3.")
+
+    weights = 1 << np.arange(zoom - 1, -1, -1, dtype="int64")
+    x = (digits & 1) @ weights
+    y = ((digits >> 1) & 1) @ weights
+    return x, y, zoom
+
+
+def tiles_to_quadkeys(x, y, zoom: int) -> np.ndarray:
+    """
+    Converts tile x/y indices to string quadkeys, the inverse of `quadkeys_to_tiles`.
+
+    Parameters
+    ----------
+    x : array-like
+        Tile x indices.
+    y : array-like
+        Tile y indices.
+    zoom : int
+        Zoom level.
+
+    Returns
+    -------
+    np.ndarray
+        Quadkeys as strings of length `zoom`.
+    """
+    x = np.asarray(x, dtype="int64")
+    y = np.asarray(y, dtype="int64")
+    shifts = np.arange(zoom - 1, -1, -1, dtype="int64")
+    digits = ((x[:, None] >> shifts) & 1) + 2 * ((y[:, None] >> shifts) & 1) + ord("0")
+    return digits.astype("uint8").view(f"S{zoom}").ravel().astype("str")
@@ -0,0 +1,186 @@
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "notebooks" / "conflict"))
+
+import acled_store  # noqa: E402
+from acled_store import AcledEventStore  # noqa: E402
+
+
+class MockAcledApi:
+    """In-memory stand-in for the ACLED `acled/read` and `deleted/read` endpoints."""
+
+    def __init__(self):
+        self.events = {}
+        self.deleted = []
+        self.calls = []
+        self.fail = set()
+
+    def add(self, event_id, country, event_date, timestamp):
+        self.events[event_id] = {
+            "event_id_cnty": event_id,
+            "country": country,
+            "event_date": event_date,
+            "timestamp": str(timestamp),
+        }
+
+    def delete(self, event_id, timestamp):
+        self.events.pop(event_id, None)
+        self.deleted.append({"event_id_cnty": event_id, "deleted_timestamp": str(timestamp)})
+
+    def get(self, url, params, timeout):
+        endpoint = url.rsplit("/", 2)[-2] + "/" + url.rsplit("/", 1)[-1]
+        self.calls.append((endpoint, dict(params)))
+        if endpoint in self.fail or params.get("country") in self.fail:
+            raise ConnectionError(f"{endpoint} unavailable")
+
+        if endpoint == "deleted/read":
+            records = [d for d in self.deleted if int(d["deleted_timestamp"]) >= params["deleted_timestamp"]]
+        else:
+            records = [e for e in self.events.values() if e["country"] == params["country"]]
+            if "timestamp" in params:
+                records = [e for e in records if int(e["timestamp"]) >= params["timestamp"]]
+            else:
+                start, end = params["event_date"].split("|")
+                records = [e for e in records if start <= e["event_date"] <= end]
+
+        start = (params["page"] - 1) * params["limit"]
+        response = mock.Mock()
+        response.json.return_value = {"success": True, "data": records[start:start + params["limit"]]}
+        return response
+
+    def country_calls(self, country):
+        return [p for endpoint, p in self.calls if endpoint == "acled/read" and p["country"] == country]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = MockAcledApi()
+    monkeypatch.setattr(acled_store.requests, "get", api.get)
+    monkeypatch.setattr(AcledEventStore, "PAGE_SIZE", 2)
+    return api
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AcledEventStore(tmp_path / "events.sqlite")
+
+
+def sync(store, countries=("Syria",), start_date="2020-01-01", end_date="2024-12-31"):
+    return store.sync(list(countries), "me@example.org", "key", start_date=start_date, end_date=end_date)
+
+
+def stored_ids(store):
+    return sorted(store.materialize(convert_types=False).get("event_id_cnty", []))
+
+
+def test_first_sync_pages_through_date_range(api, store):
+    for i in range(5):
+        api.add(f"SYR{i}", "Syria", f"2020-0{i + 1}-01", 100 + i)
+
+    summary = sync(store)
+
+    assert stored_ids(store) == [f"SYR{i}" for i in range(5)]
+    assert summary.set_index("country").loc["Syria", "nrUpserted"] == 5
+    calls = api.country_calls("Syria")
+    assert [c["page"] for c in calls] == [1, 2, 3]
+    assert all(c["event_date"] == "2020-01-01|2024-12-31" for c in calls)
+
+
+def test_incremental_sync_fetches_since_last_timestamp(api, store):
+    api.add("SYR1", "Syria", "2020-01-01", 100)
+    sync(store)
+    api.add("SYR2", "Syria", "2020-02-01", 200)
+    api.calls.clear()
+
+    sync(store)
+
+    assert stored_ids(store) == ["SYR1", "SYR2"]
+    call = api.country_calls("Syria")[0]
+    assert (call["timestamp"], call["timestamp_where"]) == (100, ">=")
+    assert "event_date" not in call
+
+
+def test_widened_date_range_is_backfilled(api, store):
+    api.add("SYR0", "Syria", "2019-06-01", 50)
+    api.add("SYR1", "Syria", "2020-01-01", 100)
+    api.add("SYR2", "Syria", "2025-01-15", 150)
+    api.add("SYR3", "Syria", "2024-12-20", 200)
+    sync(store)
+    assert stored_ids(store) == ["SYR1", "SYR3"]
+    api.calls.clear()
+
+    sync(store, start_date="2019-01-01", end_date="2025-12-31")
+
+    assert stored_ids(store) == ["SYR0", "SYR1", "SYR2", "SYR3"]
+    ranges = sorted({c["event_date"] for c in api.country_calls("Syria") if "event_date" in c})
+    assert ranges == ["2019-01-01|2020-01-01", "2024-12-31|2025-12-31"]
+
+    # The widened range is remembered, so the next sync is incremental only.
+    api.calls.clear()
+    sync(store, start_date="2019-01-01", end_date="2025-12-31")
+    assert all("event_date" not in c for c in api.country_calls("Syria"))
+
+
+def test_resent_events_at_same_timestamp_are_deduplicated(api, store):
+    api.add("SYR1", "Syria", "2020-01-01", 100)
+    sync(store)
+    # Modified in place at the same timestamp as the watermark.
+    api.add("SYR1", "Syria", "2020-01-02", 100)
+
+    sync(store)
+    sync(store)
+
+    data = store.materialize(convert_types=False)
+    assert list(data["event_id_cnty"]) == ["SYR1"]
+    assert list(data["event_date"]) == ["2020-01-02"]
+
+
+def test_deletions_are_applied_and_retried_after_failure(api, store):
+    api.add("SYR1", "Syria", "2020-01-01", 500)
+    api.add("SYR2", "Syria", "2020-01-02", 500)
+    sync(store)
+
+    api.delete("SYR1", 600)
+    api.add("SYR3", "Syria", "2020-01-03", 900)
+    api.fail.add("deleted/read")
+    with pytest.raises(RuntimeError, match="deleted events"):
+        sync(store)
+    assert stored_ids(store) == ["SYR1", "SYR2", "SYR3"]
+
+    api.fail.clear()
+    api.calls.clear()
+    summary = sync(store)
+
+    assert stored_ids(store) == ["SYR2", "SYR3"]
+    assert summary.attrs["nrDeleted"] == 1
+    deleted_call = [p for endpoint, p in api.calls if endpoint == "deleted/read"][0]
+    assert deleted_call["deleted_timestamp"] == 500
+
+
+def test_empty_country_keeps_date_bound(api, store):
+    api.add("SYR1", "Syria", "2020-01-01", 100)
+    sync(store, ["Syria", "Bahrain"])
+    api.calls.clear()
+
+    sync(store, ["Syria", "Bahrain"])
+
+    call = api.country_calls("Bahrain")[0]
+    assert call["event_date"] == "2020-01-01|2024-12-31"
+    assert "timestamp" not in call
+    deleted_call = [p for endpoint, p in api.calls if endpoint == "deleted/read"][0]
+    assert deleted_call["deleted_timestamp"] == 100
+
+
+def test_failed_country_raises_after_storing_the_others(api, store):
+    api.add("SYR1", "Syria", "2020-01-01", 100)
+    api.add("BHR1", "Bahrain", "2020-01-01", 100)
+    api.fail.add("Bahrain")
+
+    with pytest.raises(RuntimeError, match="Bahrain"):
+        sync(store, ["Syria", "Bahrain"])
+
+    assert stored_ids(store) == ["SYR1"]